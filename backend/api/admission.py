@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from fastapi import APIRouter
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Uploads running stage work at the same time
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "2"))
+# Uploads allowed to wait for a free slot
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "8"))
+# Total declared upload bytes across running and waiting jobs
+MAX_QUEUED_BYTES = int(os.environ.get("MAX_QUEUED_BYTES", str(200 * 1024 * 1024)))
+# Largest single upload accepted
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Sustained uploads per client per minute (token bucket, bursts up to the same number)
+RATE_LIMIT_PER_MINUTE = int(os.environ.get("RATE_LIMIT_PER_MINUTE", "30"))
+# Longest a queued upload waits for a slot before being shed
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("QUEUE_TIMEOUT_SECONDS", "30"))
+
+# Routes that go through admission control
+ADMITTED_PATHS = ("/process/stage1", "/process/full")
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds concurrent upload jobs, queued jobs and queued bytes, and rate-limits
+    each client. Requests over a limit are rejected immediately (429/503/413 with
+    Retry-After) rather than piling up in memory.
+    """
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        max_queued_bytes: int = MAX_QUEUED_BYTES,
+        max_upload_bytes: int = MAX_UPLOAD_BYTES,
+        rate_per_minute: int = RATE_LIMIT_PER_MINUTE,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_bytes = max_queued_bytes
+        self.max_upload_bytes = max_upload_bytes
+        self.rate_per_minute = rate_per_minute
+        self.queue_timeout = queue_timeout
+
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._running = 0
+        self._waiting = 0
+        self._bytes = 0
+        # client -> (tokens, last refill time)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        # Exponential moving average of job duration, used for Retry-After hints
+        self._avg_job_seconds = 5.0
+        self._counters = {"admitted": 0, "rate_limited": 0, "too_large": 0, "shed": 0, "timed_out": 0}
+
+    def _retry_after(self) -> int:
+        backlog = (self._waiting + self._running) / max(1, self.max_concurrent)
+        return max(1, math.ceil(self._avg_job_seconds * max(1.0, backlog)))
+
+    def _take_token(self, client: str):
+        if self.rate_per_minute <= 0:
+            return
+        now = time.monotonic()
+        refill = self.rate_per_minute / 60.0
+        tokens, last = self._buckets.get(client, (float(self.rate_per_minute), now))
+        tokens = min(float(self.rate_per_minute), tokens + (now - last) * refill)
+        if tokens < 1.0:
+            self._buckets[client] = (tokens, now)
+            self._counters["rate_limited"] += 1
+            raise AdmissionRejected(429, "Rate limit exceeded.", math.ceil((1.0 - tokens) / refill))
+        self._buckets[client] = (tokens - 1.0, now)
+        if len(self._buckets) > 10000:
+            # Drop clients whose buckets have refilled completely
+            full_after = self.rate_per_minute / refill
+            self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+
+    @asynccontextmanager
+    async def admit(self, client: str, size: int):
+        """Holds a job slot for the duration of the block, or raises AdmissionRejected."""
+        if size > self.max_upload_bytes:
+            raise self.too_large()
+
+        self._take_token(client)
+
+        # Decided from our own counters: the semaphore only reports locked() once an
+        # acquire has run, so a burst arriving in one loop tick would all slip past it
+        if self._bytes + size > self.max_queued_bytes or (
+            self._running + self._waiting >= self.max_concurrent + self.max_queued
+        ):
+            self._counters["shed"] += 1
+            raise AdmissionRejected(503, "Server is at capacity.", self._retry_after())
+
+        self._bytes += size
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._bytes -= size
+            self._counters["timed_out"] += 1
+            raise AdmissionRejected(503, "Timed out waiting for capacity.", self._retry_after())
+        except BaseException:
+            # Cancelled (e.g. client went away) while queued: release the byte reservation
+            self._bytes -= size
+            raise
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        self._counters["admitted"] += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * (time.monotonic() - started)
+            self._running -= 1
+            self._bytes -= size
+            self._slots.release()
+
+    def too_large(self) -> AdmissionRejected:
+        self._counters["too_large"] += 1
+        return AdmissionRejected(413, f"Upload exceeds {self.max_upload_bytes} bytes.")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running_jobs": self._running,
+            "queued_jobs": self._waiting,
+            "queued_bytes": self._bytes,
+            "avg_job_seconds": self._avg_job_seconds,
+            "limits": {
+                "max_concurrent_jobs": self.max_concurrent,
+                "max_queued_jobs": self.max_queued,
+                "max_queued_bytes": self.max_queued_bytes,
+                "max_upload_bytes": self.max_upload_bytes,
+                "rate_limit_per_minute": self.rate_per_minute
+            },
+            "counters": dict(self._counters)
+        }
+
+controller = AdmissionController()
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control to ADMITTED_PATHS before the
+    upload body is read, so shed requests cost no memory or disk. Uploads without
+    a Content-Length reserve MAX_UPLOAD_BYTES of queue space, and every body is
+    counted as it arrives so one that outgrows MAX_UPLOAD_BYTES is cut off with 413.
+    """
+    def __init__(self, app, admission: AdmissionController = controller):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in ADMITTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        client = request.client.host if request.client else "unknown"
+        try:
+            size = int(request.headers["content-length"])
+        except (KeyError, ValueError):
+            # Chunked or malformed: assume the largest upload we would accept
+            size = self.admission.max_upload_bytes
+
+        try:
+            async with self.admission.admit(client, size):
+                await self._call_limited(scope, receive, send, client)
+        except AdmissionRejected as e:
+            await self._reject(scope, receive, send, client, e)
+
+    async def _reject(self, scope, receive, send, client: str, e: AdmissionRejected):
+        logger.warning(f"Rejected upload from {client}: {e.detail}")
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=headers)
+        await response(scope, receive, send)
+
+    async def _call_limited(self, scope, receive, send, client: str):
+        """Runs the app, answering 413 and disconnecting it once the body passes MAX_UPLOAD_BYTES."""
+        received = 0
+        response_started = False
+        cut_off = False
+
+        async def limited_receive():
+            nonlocal received, cut_off
+            if cut_off:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.admission.max_upload_bytes:
+                    cut_off = True
+                    if not response_started:
+                        await self._reject(scope, receive, send, client, self.admission.too_large())
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if cut_off:
+                # The 413 has already been sent; drop whatever the app says after losing its body
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+@router.get("/metrics/admission")
+def admission_metrics():
+    return controller.metrics()
@@ -1,46 +1,74 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import os
+from contextlib import nullcontext
+from typing import Optional, Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Header
+from starlette.concurrency import run_in_threadpool
 from backend.pipeline import (
-    stage1_processing,
-    stage2_simplification,
-    stage3_translation,
-    stage4_pose_gen,
-    stage5_animation
+    executor,
+    profiling,
+    stage1_processing
 )
 
 router = APIRouter()
 
+def _profiler_for(name: str, profile: bool, x_profile: Optional[str]):
+    """Opt-in profiling via ?profile=true or an 'X-Profile: 1' header."""
+    if profile or (x_profile or "").lower() in ("1", "true", "yes"):
+        return profiling.profile(name)
+    return nullcontext()
+
+def _profile_report(profiler: profiling.SamplingProfiler) -> Dict[str, Any]:
+    speedscope_path, collapsed_path = profiler.save()
+    return {
+        **profiler.summary(),
+        "speedscope_url": "/" + speedscope_path.replace(os.sep, "/"),
+        "collapsed_url": "/" + collapsed_path.replace(os.sep, "/")
+    }
+
 @router.post("/process/stage1")
-async def process_document(file: UploadFile = File(...)):
+async def process_document(
+    file: UploadFile = File(...),
+    profile: bool = Query(False),
+    x_profile: Optional[str] = Header(None)
+):
     """Stage 1: Document Processing Only."""
     try:
-        result = await stage1_processing.process_file(file)
-        return {"status": "success", "data": result}
+        with _profiler_for(f"stage1:{file.filename}", profile, x_profile) as profiler:
+            with profiling.stage("stage1_processing"):
+                result = await stage1_processing.process_file(file)
+        response = {"status": "success", "data": result}
+        if profiler:
+            response["profile"] = _profile_report(profiler)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/process/full")
-async def process_pipeline(file: UploadFile = File(...)):
+async def process_pipeline(
+    file: UploadFile = File(...),
+    fps: int = Query(30, ge=1, le=60),
+    speed: float = Query(1.0, ge=0.25, le=4.0),
+    profile: bool = Query(False),
+    x_profile: Optional[str] = Header(None)
+):
     """
     Full End-to-End Pipeline:
     Doc -> Text -> Simplified -> Gloss -> Pose -> Animation Metadata
+    With ?profile=true (or X-Profile: 1) the run is sampled and a flamegraph is returned.
     """
     try:
-        # Stage 1
-        s1_result = await stage1_processing.process_file(file)
-        
-        # Stage 2
-        s2_result = stage2_simplification.process_stage2(s1_result)
-        
-        # Stage 3
-        s3_result = stage3_translation.process_stage3(s2_result)
-        
-        # Stage 4
-        s4_result = stage4_pose_gen.process_stage4(s3_result)
-        
-        # Stage 5
-        s5_result = stage5_animation.process_stage5(s4_result)
+        with _profiler_for(f"process_full:{file.filename}", profile, x_profile) as profiler:
+            # Stage 1
+            with profiling.stage("stage1_processing"):
+                s1_result = await stage1_processing.process_file(file)
+            
+            # Stages 2-5, fanned out per chapter across the worker pool
+            chapters_result = await run_in_threadpool(executor.run_pipeline, s1_result, fps=fps, speed=speed)
+        s2_result = {"simplified_chapters": chapters_result["simplified_chapters"]}
+        s3_result = {"gloss_chapters": chapters_result["gloss_chapters"]}
+        s5_result = chapters_result["animation"]
         
-        return {
+        response = {
             "status": "success",
             "pipeline_summary": {
                 "original_filename": file.filename,
@@ -54,5 +82,8 @@ async def process_pipeline(file: UploadFile = File(...)):
                 # omitting stage 4 huge pose data
             }
         }
+        if profiler:
+            response["profile"] = _profile_report(profiler)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
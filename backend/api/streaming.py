@@ -0,0 +1,116 @@
+import logging
+import os
+from contextlib import closing
+from itertools import islice
+from typing import Iterator, List, Dict, Any, Tuple
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from backend.pipeline import stage4_pose_gen, stage5_animation
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+OUTPUT_DIR = "outputs"
+# Frames packed into each binary message when replaying a chapter file
+FRAMES_PER_MESSAGE = 30
+# Binary messages the client may hold un-acknowledged before the server pauses
+MAX_IN_FLIGHT = 4
+
+def _load_chapter(chapter_file: str) -> Tuple[int, Iterator[List[Dict[str, Any]]]]:
+    """Returns the chapter's fps and its frames in FRAMES_PER_MESSAGE batches, read lazily from disk."""
+    # basename() keeps clients from reading outside the outputs directory
+    path = os.path.join(OUTPUT_DIR, os.path.basename(chapter_file))
+    metadata, frames = stage5_animation.read_animation_json(path)
+    return metadata.get("fps", 30), _batched(frames)
+
+def _batched(frames: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    with closing(frames):
+        while True:
+            batch = list(islice(frames, FRAMES_PER_MESSAGE))
+            if not batch:
+                return
+            yield batch
+
+def _gloss_frame_batches(gloss: str, fps: int, speed: float) -> Iterator[List[Dict[str, Any]]]:
+    # One message per sign, generated on demand
+    for frames in stage4_pose_gen.iter_gloss_signs(gloss, fps, speed):
+        if frames:
+            yield frames
+
+def pack_frames(frames: List[Dict[str, Any]]) -> bytes:
+    """Packs frames as little-endian float32, FLOATS_PER_FRAME values per frame."""
+    return stage4_pose_gen.frames_to_array(frames).astype("<f4").tobytes()
+
+@router.websocket("/ws/poses")
+async def stream_poses(websocket: WebSocket):
+    """
+    Streams pose frames as packed float32 binary messages.
+
+    Protocol:
+    1. Client sends {"chapter": "<file in /outputs>"} or {"gloss": "HELLO WORLD"}
+       (gloss requests may add "fps" and "speed").
+    2. Server sends a JSON header describing the channel layout.
+    3. Server sends binary messages of N * floats_per_frame float32 values (NaN = channel absent).
+       The client acknowledges each one with {"type": "ack"}; at most MAX_IN_FLIGHT
+       messages are outstanding before the server waits.
+    4. Server sends {"type": "end", "total_frames": n}.
+    """
+    await websocket.accept()
+    batches = None
+    try:
+        request = await websocket.receive_json()
+        # File reads and pose generation block, so they run off the event loop
+        if request.get("chapter"):
+            fps, batches = await run_in_threadpool(_load_chapter, request["chapter"])
+        elif request.get("gloss"):
+            fps = min(60, max(1, int(request.get("fps", stage4_pose_gen.DEFAULT_FPS))))
+            speed = min(4.0, max(0.25, float(request.get("speed", 1.0))))
+            batches = _gloss_frame_batches(str(request["gloss"]), fps, speed)
+        else:
+            await websocket.send_json({"type": "error", "detail": "Expected 'chapter' or 'gloss'."})
+            await websocket.close()
+            return
+
+        await websocket.send_json({
+            "type": "header",
+            "bones": stage4_pose_gen.BONE_ORDER,
+            "face": stage4_pose_gen.FACE_CHANNELS,
+            "floats_per_frame": stage4_pose_gen.FLOATS_PER_FRAME,
+            "fps": fps,
+            "dtype": "float32-le"
+        })
+
+        in_flight = 0
+        total_frames = 0
+        while True:
+            frames = await run_in_threadpool(next, batches, None)
+            if frames is None:
+                break
+            while in_flight >= MAX_IN_FLIGHT:
+                message = await websocket.receive_json()
+                if message.get("type") == "ack":
+                    in_flight -= 1
+            await websocket.send_bytes(pack_frames(frames))
+            in_flight += 1
+            total_frames += len(frames)
+
+        await websocket.send_json({"type": "end", "total_frames": total_frames})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        logger.info("Pose stream client disconnected.")
+    except FileNotFoundError:
+        await websocket.send_json({"type": "error", "detail": "Chapter not found."})
+        await websocket.close()
+    except Exception as e:
+        logger.error(f"Pose stream failed: {e}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close()
+    finally:
+        # Releases the chapter file if the client left mid-stream
+        close = getattr(batches, "close", None)
+        if close:
+            close()
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from backend.pipeline import (
+    stage2_simplification,
+    stage3_translation,
+    stage4_pose_gen
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Interactive queries are short; longer inputs belong on /process/full
+TRANSLATE_MAX_CHARS = 1000
+# Target p99 latency for /translate, in milliseconds
+TRANSLATE_P99_BUDGET_MS = float(os.environ.get("TRANSLATE_P99_BUDGET_MS", "50"))
+# Entries kept in the simplification and timeline caches
+TRANSLATE_CACHE_SIZE = int(os.environ.get("TRANSLATE_CACHE_SIZE", "1024"))
+# Decimal places kept for rotations in the inline timeline
+TIMELINE_PRECISION = 4
+# Minimum seconds between repeated "p99 over budget" warnings
+P99_WARNING_INTERVAL_SECONDS = 60.0
+
+# Recent request latencies used for the p99 estimate
+_latencies_ms = deque(maxlen=1000)
+_last_p99_warning = 0.0
+
+class TranslateRequest(BaseModel):
+    text: str
+    simplify: bool = True
+    fps: int = Field(30, ge=1, le=60)
+    speed: float = Field(1.0, ge=0.25, le=4.0)
+
+@lru_cache(maxsize=TRANSLATE_CACHE_SIZE)
+def _simplify(text: str) -> str:
+    # Same short-snippet filter as Stage 2
+    if len(text.split()) <= 5:
+        return text
+    return stage2_simplification.simplify_text(text)
+
+@lru_cache(maxsize=TRANSLATE_CACHE_SIZE)
+def _compact_timeline(gloss: str, fps: int, speed: float) -> List[List[Optional[float]]]:
+    """Frame rows in the stage 4 channel layout, with null for absent channels."""
+    frames = stage4_pose_gen.build_gloss_sequence(gloss, fps, speed)
+    packed = np.round(stage4_pose_gen.frames_to_array(frames).astype(float), TIMELINE_PRECISION)
+    return [[None if np.isnan(v) else v for v in row] for row in packed.tolist()]
+
+def translate(text: str, simplify: bool = True, fps: int = 30, speed: float = 1.0) -> Dict[str, Any]:
+    """Runs simplification (optional), gloss and pose generation in memory."""
+    simplified = _simplify(text) if simplify else text
+    # Stage 3 memoizes per normalized paragraph, so repeats skip the spaCy parse
+    gloss = stage3_translation.process_paragraph_to_gloss(simplified)
+    frames = _compact_timeline(gloss, fps, speed)
+    return {
+        "simplified_text": simplified,
+        "gloss": gloss,
+        "timeline": {
+            "fps": fps,
+            "bones": stage4_pose_gen.BONE_ORDER,
+            "face": stage4_pose_gen.FACE_CHANNELS,
+            "total_frames": len(frames),
+            "frames": frames
+        }
+    }
+
+def latency_stats() -> Dict[str, Any]:
+    samples = list(_latencies_ms)
+    return {
+        "samples": len(samples),
+        "p50_ms": float(np.percentile(samples, 50)) if samples else None,
+        "p99_ms": float(np.percentile(samples, 99)) if samples else None,
+        "p99_budget_ms": TRANSLATE_P99_BUDGET_MS,
+        "simplify_cache": _simplify.cache_info()._asdict(),
+        "gloss_cache": stage3_translation.gloss_cache_info(),
+        "timeline_cache": _compact_timeline.cache_info()._asdict()
+    }
+
+def warm_up():
+    """Primes model kernels and caches so the first interactive query takes the warm path."""
+    started = time.perf_counter()
+    translate("Hello, my name is Zephyr and I am here to help you learn today.")
+    logger.info(f"Translate warm path ready in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+def _check_p99_budget():
+    """Warns when the rolling p99 is over budget, at most once per P99_WARNING_INTERVAL_SECONDS."""
+    global _last_p99_warning
+    now = time.monotonic()
+    if now - _last_p99_warning < P99_WARNING_INTERVAL_SECONDS:
+        return
+    p99_ms = float(np.percentile(_latencies_ms, 99))
+    if p99_ms > TRANSLATE_P99_BUDGET_MS:
+        _last_p99_warning = now
+        logger.warning(f"/translate p99 {p99_ms:.1f} ms exceeds budget of {TRANSLATE_P99_BUDGET_MS:.0f} ms.")
+
+@router.post("/translate")
+def translate_text(request: TranslateRequest):
+    """
+    Interactive text-to-sign: returns the gloss and compact pose timeline inline,
+    without writing animation files.
+    """
+    text = " ".join(request.text.split())
+    if not text:
+        raise HTTPException(status_code=400, detail="Text is empty.")
+    if len(text) > TRANSLATE_MAX_CHARS:
+        raise HTTPException(status_code=413, detail=f"Text exceeds {TRANSLATE_MAX_CHARS} characters; use /process/full.")
+
+    started = time.perf_counter()
+    try:
+        result = translate(text, request.simplify, request.fps, request.speed)
+    except Exception as e:
+        logger.error(f"Translate failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    _latencies_ms.append(latency_ms)
+    _check_p99_budget()
+
+    return {
+        "status": "success",
+        "latency_ms": latency_ms,
+        "data": result
+    }
+
+@router.get("/translate/stats")
+def translate_stats():
+    return latency_stats()
@@ -1,9 +1,14 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api import routes
+from backend.api import admission, routes, streaming, translate
+from backend.pipeline import executor
 
 app = FastAPI(title="SignAI Pipeline API")
 
+# Shed upload load before bodies are read (added first so CORS headers still wrap rejections)
+app.add_middleware(admission.AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -18,11 +23,25 @@ import os
 
 # Include API routes
 app.include_router(routes.router)
+app.include_router(streaming.router)
+app.include_router(translate.router)
+app.include_router(admission.router)
 
 # Mount static files for outputs
 os.makedirs("outputs", exist_ok=True)
 app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 
+@app.on_event("startup")
+def warm_translate_path():
+    try:
+        translate.warm_up()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Translate warm-up failed: {e}")
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    executor.shutdown_pool()
+
 @app.get("/")
 def read_root():
     return {"message": "SignAI Backend is running"}
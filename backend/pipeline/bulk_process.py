@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Set, Tuple
+
+from fastapi import UploadFile
+
+from backend.pipeline import (
+    profiling,
+    stage1_processing,
+    stage2_simplification,
+    stage3_translation,
+    stage4_pose_gen,
+    stage5_animation
+)
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".ppt", ".txt", ".md"}
+
+
+class InlineExecutor(Executor):
+    """Runs tasks in the calling thread, so a profiling run can sample them."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def find_documents(input_dir: Path) -> List[Path]:
+    return sorted(p for p in input_dir.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
+
+
+def document_key(path: Path) -> str:
+    """Content hash, so renamed or copied documents are only processed once."""
+    digest = hashlib.sha1()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Append-only JSONL map of input text -> stage result, reloaded on resume."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, str] = {}
+        if path.exists():
+            with path.open() as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from an interrupted run
+                        continue
+                    self.entries[record["input"]] = record["output"]
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.entries
+
+    def get(self, text: str, default: str) -> str:
+        return self.entries.get(text, default)
+
+    def update(self, inputs: List[str], outputs: List[str]):
+        with self.path.open("a") as f:
+            for text, result in zip(inputs, outputs):
+                self.entries[text] = result
+                f.write(json.dumps({"input": text, "output": result}) + "\n")
+
+
+def _load_state(path: Path) -> Dict[str, Any]:
+    if path.exists():
+        with path.open() as f:
+            return json.load(f)
+    return {"documents": {}}
+
+
+def _save_state(path: Path, state: Dict[str, Any]):
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _extract(path: str) -> Dict[str, Any]:
+    try:
+        with profiling.stage("stage1_processing"), open(path, "rb") as f:
+            upload = UploadFile(file=f, filename=os.path.basename(path))
+            return asyncio.run(stage1_processing.process_file(upload))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _simplify_batch(paragraphs: List[str]) -> List[str]:
+    with profiling.stage("stage2_simplification"):
+        return stage2_simplification.simplify_texts(paragraphs)
+
+
+def _gloss_batch(paragraphs: List[str]) -> List[str]:
+    with profiling.stage("stage3_translation"):
+        return [stage3_translation.process_paragraph_to_gloss(p) for p in paragraphs]
+
+
+def _finish_document(gloss_data: Dict[str, Any], animation_dir: str, fps: int) -> Dict[str, Any]:
+    with profiling.stage("stage4_pose_gen"):
+        s4_result = stage4_pose_gen.process_stage4(gloss_data, fps)
+    with profiling.stage("stage5_animation"):
+        # Bulk outputs are not served by the API, so record the real file paths
+        return stage5_animation.process_stage5(s4_result, output_dir=animation_dir, url_prefix=None)
+
+
+def _run_batches(
+    pool,
+    fn: Callable[[List[str]], List[str]],
+    texts: List[str],
+    batch_size: int,
+    cache: ResultCache
+) -> Set[str]:
+    """
+    Runs fn over texts in batches across the pool, recording results as each batch completes.
+    Returns the texts whose batch failed; they are not cached, so a rerun retries them.
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    futures = {pool.submit(fn, batch): batch for batch in batches}
+    failed: Set[str] = set()
+    for done, future in enumerate(as_completed(futures), start=1):
+        batch = futures[future]
+        try:
+            results = future.result()
+            if len(results) != len(batch):
+                raise ValueError(f"expected {len(batch)} results, got {len(results)}")
+            cache.update(batch, results)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} paragraphs failed: {e}")
+            failed.update(batch)
+        logger.info(f"{fn.__name__}: {done}/{len(batches)} batches")
+    return failed
+
+
+def _fail_dependents(
+    requested_by: Dict[str, List[str]],
+    failed_texts: Set[str],
+    stage: str,
+    results: Dict[str, Any],
+    sources: Dict[str, Path],
+    documents: Dict[str, Any]
+) -> int:
+    """Marks documents that needed a failed paragraph as failed and drops them from results."""
+    count = 0
+    for key, texts in requested_by.items():
+        if key in results and failed_texts.intersection(texts):
+            del results[key]
+            documents[key] = {"source": str(sources[key]), "status": "failed", "error": f"{stage} batch failed"}
+            count += 1
+    return count
+
+
+def _collect(requested: List[str]):
+    """Stage callback that records the texts a stage asks for and returns them unchanged."""
+    def record(texts):
+        if isinstance(texts, str):
+            requested.append(texts)
+            return texts
+        requested.extend(texts)
+        return list(texts)
+    return record
+
+
+def run_bulk(
+    input_dir: Path,
+    output_dir: Path,
+    workers: int,
+    batch_size: int,
+    fps: int,
+    profile: bool = False
+) -> Dict[str, Any]:
+    """
+    Processes every supported document under input_dir through the five stages.
+    Stage 2/3 work is deduplicated across the whole corpus and batched; stage 1 and
+    stages 4-5 run per document. Progress is checkpointed so a rerun resumes.
+    With profile=True everything runs in-process and a flamegraph is written to output_dir.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    state_dir = output_dir / "state"
+    results_dir = output_dir / "results"
+    animation_dir = output_dir / "animations"
+    for d in (state_dir, results_dir, animation_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    state_path = state_dir / "manifest.json"
+    state = _load_state(state_path)
+    documents = state["documents"]
+
+    paths = find_documents(input_dir)
+    pending: List[Tuple[str, Path]] = []
+    seen = set()
+    skipped = duplicates = 0
+    for path in paths:
+        key = document_key(path)
+        if documents.get(key, {}).get("status") == "done":
+            skipped += 1
+        elif key in seen:
+            duplicates += 1
+        else:
+            seen.add(key)
+            pending.append((key, path))
+    logger.info(f"Found {len(paths)} documents: {len(pending)} to process, {skipped} already done, {duplicates} duplicates.")
+
+    simplified_cache = ResultCache(state_dir / "simplified.jsonl")
+    gloss_cache = ResultCache(state_dir / "gloss.jsonl")
+    failed = 0
+    paragraph_stats = {}
+
+    if profile:
+        # The sampler only sees this process, so run the stages inline
+        pool_context = InlineExecutor()
+    else:
+        # 'spawn' gives each worker a clean interpreter with its own loaded models
+        pool_context = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    with (profiling.profile("bulk") if profile else nullcontext()) as profiler, pool_context as pool:
+        sources = dict(pending)
+
+        # Stage 1: extraction, one document per task
+        phase = time.perf_counter()
+        extracted: Dict[str, Dict[str, Any]] = {}
+        for (key, path), data in zip(pending, pool.map(_extract, [str(p) for _, p in pending])):
+            if "error" in data:
+                failed += 1
+                documents[key] = {"source": str(path), "status": "failed", "error": data["error"]}
+                _save_state(state_path, state)
+                continue
+            extracted[key] = data
+        timings["stage1"] = time.perf_counter() - phase
+
+        # Stage 2: simplify each distinct paragraph in the corpus once
+        phase = time.perf_counter()
+        requested_by: Dict[str, List[str]] = {}
+        for key, data in extracted.items():
+            stage2_simplification.process_stage2(data, simplify=_collect(requested_by.setdefault(key, [])))
+        requested = [t for texts in requested_by.values() for t in texts]
+        unique = [t for t in dict.fromkeys(requested) if t not in simplified_cache]
+        failed_texts = _run_batches(pool, _simplify_batch, unique, batch_size, simplified_cache)
+        failed += _fail_dependents(requested_by, failed_texts, "stage2", extracted, sources, documents)
+        _save_state(state_path, state)
+        stage2_results = {
+            key: stage2_simplification.process_stage2(
+                data, simplify=lambda texts: [simplified_cache.get(t, t) for t in texts]
+            )
+            for key, data in extracted.items()
+        }
+        paragraph_stats["stage2"] = {"requested": len(requested), "unique": len(set(requested)), "computed": len(unique)}
+        timings["stage2"] = time.perf_counter() - phase
+
+        # Stage 3: gloss each distinct simplified paragraph once
+        phase = time.perf_counter()
+        requested_by = {}
+        for key, data in stage2_results.items():
+            stage3_translation.process_stage3(data, gloss=_collect(requested_by.setdefault(key, [])))
+        requested = [t for texts in requested_by.values() for t in texts]
+        unique = [t for t in dict.fromkeys(requested) if t not in gloss_cache]
+        failed_texts = _run_batches(pool, _gloss_batch, unique, batch_size, gloss_cache)
+        failed += _fail_dependents(requested_by, failed_texts, "stage3", stage2_results, sources, documents)
+        _save_state(state_path, state)
+        stage3_results = {
+            key: stage3_translation.process_stage3(data, gloss=lambda p: gloss_cache.get(p, p.upper()))
+            for key, data in stage2_results.items()
+        }
+        paragraph_stats["stage3"] = {"requested": len(requested), "unique": len(set(requested)), "computed": len(unique)}
+        timings["stage3"] = time.perf_counter() - phase
+
+        # Stages 4-5: poses and animation files, one document per task
+        phase = time.perf_counter()
+        futures = {
+            pool.submit(_finish_document, gloss_data, str(animation_dir), fps): key
+            for key, gloss_data in stage3_results.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            source = sources[key]
+            try:
+                animation = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"{source} failed in stages 4-5: {e}")
+                documents[key] = {"source": str(source), "status": "failed", "error": str(e)}
+                _save_state(state_path, state)
+                continue
+            result_path = results_dir / f"{source.stem}-{key[:8]}.json"
+            with result_path.open("w") as f:
+                json.dump({
+                    "source": str(source),
+                    "stages_completed": ["processing", "simplification", "translation", "pose_gen", "animation"],
+                    "final_output": animation,
+                    "gloss_chapters": stage3_results[key]["gloss_chapters"]
+                }, f)
+            documents[key] = {"source": str(source), "status": "done", "result": str(result_path)}
+            _save_state(state_path, state)
+        timings["stage4_5"] = time.perf_counter() - phase
+
+    summary = {
+        "input_dir": str(input_dir),
+        "documents_found": len(paths),
+        "documents_processed": len(pending) - failed,
+        "documents_failed": failed,
+        "documents_skipped": skipped,
+        "duplicate_documents": duplicates,
+        "paragraphs": paragraph_stats,
+        "timings_seconds": timings,
+        "elapsed_seconds": time.perf_counter() - started,
+        "failures": [
+            {"source": d["source"], "error": d.get("error")}
+            for d in documents.values() if d.get("status") == "failed"
+        ]
+    }
+    if profiler:
+        speedscope_path, collapsed_path = profiler.save(str(output_dir), "profile")
+        summary["profile"] = {**profiler.summary(), "speedscope": speedscope_path, "collapsed": collapsed_path}
+    with (output_dir / "summary.json").open("w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the sign pipeline over a folder of course documents.")
+    parser.add_argument("input", help="Directory of PDF/DOCX/PPTX (and text/Markdown) files, searched recursively.")
+    parser.add_argument("--output", default="bulk_outputs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=64, help="Paragraphs per stage 2/3 task.")
+    parser.add_argument("--fps", type=int, default=stage4_pose_gen.DEFAULT_FPS)
+    parser.add_argument("--profile", action="store_true", help="Run in-process and write a flamegraph to the output directory.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    summary = run_bulk(
+        input_dir=Path(args.input),
+        output_dir=Path(args.output),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        fps=args.fps,
+        profile=args.profile,
+    )
+    print(json.dumps({k: v for k, v in summary.items() if k != "failures"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+
+from backend.pipeline.stage4_pose_gen import (
+    BONE_ORDER,
+    COMPILED_CACHE_PATH,
+    FACE_CHANNELS,
+    POSE_CACHE_PATH,
+    SOURCE_FPS,
+    active_bounds,
+    frames_to_array,
+    motion_energy,
+    neutral_pose_array,
+)
+
+
+def fill_missing_channels(packed: np.ndarray, neutral: np.ndarray) -> np.ndarray:
+    """Replaces absent (NaN) channels with the neutral pose value for that channel."""
+    return np.where(np.isnan(packed), neutral[None, :], packed)
+
+
+def smooth_sequence(packed: np.ndarray, window: int) -> np.ndarray:
+    """Centered moving average over time, computed for all channels at once."""
+    if window <= 1 or len(packed) < 2:
+        return packed
+    window = window if window % 2 else window + 1
+    radius = window // 2
+    padded = np.pad(packed, ((radius, radius), (0, 0)), mode="edge")
+    csum = np.cumsum(np.vstack([np.zeros((1, packed.shape[1])), padded]), axis=0)
+    return (csum[window:] - csum[:-window]) / window
+
+
+def compile_sequence(frames: List[Dict], neutral: np.ndarray, window: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+    packed = fill_missing_channels(frames_to_array(frames, dtype=np.float64), neutral)
+    packed = smooth_sequence(packed, window)
+    start, end = active_bounds(packed)
+    trimmed = packed[start:end]
+    energy = motion_energy(trimmed) if len(trimmed) > 1 else np.zeros(1)
+    stats = {
+        "source_frames": len(frames),
+        "frames": len(trimmed),
+        "trimmed_lead": start,
+        "trimmed_tail": len(packed) - end,
+        "duration_seconds": len(trimmed) / SOURCE_FPS,
+        "mean_energy": float(energy.mean()),
+        "peak_energy": float(energy.max()),
+    }
+    return trimmed, stats
+
+
+def compile_pose_cache(input_path: Path, output_path: Path, window: int) -> Dict[str, Dict[str, Any]]:
+    with input_path.open() as f:
+        data = json.load(f)
+    neutral = neutral_pose_array()
+
+    glosses: List[str] = []
+    sequences: List[np.ndarray] = []
+    stats: Dict[str, Dict[str, Any]] = {}
+    for gloss, frames in data.items():
+        if not isinstance(frames, list) or not frames:
+            continue
+        packed, gloss_stats = compile_sequence(frames, neutral, window)
+        glosses.append(gloss.upper())
+        sequences.append(packed.astype(np.float32))
+        stats[gloss.upper()] = gloss_stats
+
+    offsets = np.cumsum([0] + [len(seq) for seq in sequences])
+    width = len(neutral)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        output_path,
+        bones=np.array(BONE_ORDER),
+        face=np.array(FACE_CHANNELS),
+        glosses=np.array(glosses),
+        frames=np.concatenate(sequences) if sequences else np.zeros((0, width), dtype=np.float32),
+        offsets=offsets,
+        first=np.array([seq[0] for seq in sequences]).reshape(-1, width),
+        last=np.array([seq[-1] for seq in sequences]).reshape(-1, width),
+        stats=np.array(json.dumps(stats)),
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the pose cache into normalized, precomputed arrays.")
+    parser.add_argument("--input", default=POSE_CACHE_PATH)
+    parser.add_argument("--output", default=COMPILED_CACHE_PATH)
+    parser.add_argument("--smooth-window", type=int, default=5, help="Moving-average window in frames (1 disables).")
+    args = parser.parse_args()
+
+    stats = compile_pose_cache(
+        input_path=Path(args.input),
+        output_path=Path(args.output),
+        window=args.smooth_window,
+    )
+    print(f"Compiled {len(stats)} signs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
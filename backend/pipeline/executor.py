@@ -0,0 +1,170 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+# Importing the stage modules loads their models; spawned workers import this
+# module to run chapters, so each worker process holds its own loaded models.
+from backend.pipeline import (
+    profiling,
+    stage2_simplification,
+    stage3_translation,
+    stage4_pose_gen,
+    stage5_animation
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes used to run stages 2-5 per chapter.
+# 1 (the default) runs every chapter sequentially in the calling process.
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", "1"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+# Guards _pool/_pool_workers; run_pipeline is called from concurrent threadpool requests
+_pool_lock = threading.Lock()
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns the shared worker pool, (re)creating it when the requested size changes."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                # Already-submitted chapters still finish on the old pool
+                _pool.shutdown(wait=False)
+            # 'spawn' keeps workers from inheriting the parent's torch/spaCy state
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+            logger.info(f"Started pipeline worker pool with {workers} processes.")
+        return _pool
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    """Drops a broken pool so the next request gets a fresh one, unless it was already replaced."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            _pool_workers = 0
+    broken.shutdown(wait=False)
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool = _pool
+        _pool = None
+        _pool_workers = 0
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+def run_chapter(
+    index: int,
+    filename: str,
+    chapter: Dict[str, Any],
+    output_dir: str = "outputs",
+    fps: int = stage4_pose_gen.DEFAULT_FPS,
+    speed: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Runs stages 2 -> 5 for a single Stage 1 chapter.
+    Output: Dict with the chapter's 'simplified_chapter', 'gloss_chapter' and 'video_chapter'
+    """
+    with profiling.stage("stage2_simplification"):
+        s2_result = stage2_simplification.process_stage2({"filename": filename, "chapters": [chapter]})
+    with profiling.stage("stage3_translation"):
+        s3_result = stage3_translation.process_stage3(s2_result)
+    with profiling.stage("stage4_pose_gen"):
+        s4_result = stage4_pose_gen.process_stage4(s3_result, fps, speed)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with profiling.stage("stage5_animation"):
+        video_chapter = stage5_animation.finalize_chapter(index, s4_result["pose_chapters"][0], output_dir)
+
+    return {
+        "simplified_chapter": s2_result["simplified_chapters"][0],
+        "gloss_chapter": s3_result["gloss_chapters"][0],
+        "video_chapter": video_chapter
+    }
+
+def _run_chapter_isolated(index: int, filename: str, chapter: Dict[str, Any], output_dir: str, fps: int, speed: float) -> Dict[str, Any]:
+    try:
+        return run_chapter(index, filename, chapter, output_dir, fps, speed)
+    except Exception as e:
+        logger.error(f"Chapter {index} ('{chapter.get('title', 'Untitled')}') failed: {e}")
+        return _failed_chapter(chapter, e)
+
+def _failed_chapter(chapter: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    # Placeholders keep every per-chapter list aligned by index with video_chapters
+    title = chapter.get("title", "Untitled")
+    return {
+        "simplified_chapter": {
+            "title": title,
+            "original_text": chapter.get("raw_text", ""),
+            "simplified_paragraphs": [],
+            "simplified_text": "",
+            "status": "failed"
+        },
+        "gloss_chapter": {
+            "title": title,
+            "simplified_text": "",
+            "glossed_paragraphs": [],
+            "gloss_sequence": [],
+            "status": "failed"
+        },
+        "video_chapter": {
+            "chapter_title": title,
+            "video_url": None,
+            "duration_seconds": 0.0,
+            "status": "failed",
+            "error": str(error)
+        }
+    }
+
+def run_pipeline(
+    stage1_data: Dict[str, Any],
+    workers: Optional[int] = None,
+    output_dir: str = "outputs",
+    fps: int = stage4_pose_gen.DEFAULT_FPS,
+    speed: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Runs stages 2 -> 5 for every chapter of a Stage 1 result, fanning chapters out
+    across the worker pool. Results are reassembled in chapter order and a failing
+    chapter is reported as 'failed' without affecting the others.
+    Output: Dict with 'simplified_chapters', 'gloss_chapters' and the Stage 5 result under 'animation'
+    """
+    workers = PIPELINE_WORKERS if workers is None else workers
+    if profiling.is_active():
+        # Worker processes are outside the sampler's reach; profile the whole run in-process
+        workers = 1
+    filename = stage1_data.get("filename", "unknown")
+    chapters = stage1_data.get("chapters", [])
+
+    logger.info(f"Running stages 2-5 for {len(chapters)} chapters of {filename} with {max(1, workers)} worker(s).")
+
+    if workers <= 1 or len(chapters) <= 1:
+        results = [_run_chapter_isolated(i, filename, ch, output_dir, fps, speed) for i, ch in enumerate(chapters)]
+    else:
+        pool = get_pool(workers)
+        futures = [pool.submit(_run_chapter_isolated, i, filename, ch, output_dir, fps, speed) for i, ch in enumerate(chapters)]
+        results = []
+        for chapter, future in zip(chapters, futures):
+            try:
+                results.append(future.result())
+            except BrokenProcessPool as e:
+                # A worker died (e.g. OOM); drop the pool so the next request gets a fresh one
+                _discard_pool(pool)
+                results.append(_failed_chapter(chapter, e))
+            except Exception as e:
+                results.append(_failed_chapter(chapter, e))
+
+    return {
+        "simplified_chapters": [r["simplified_chapter"] for r in results],
+        "gloss_chapters": [r["gloss_chapter"] for r in results],
+        "animation": stage5_animation.summarize_chapters([r["video_chapter"] for r in results])
+    }
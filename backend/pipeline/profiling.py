@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where request profiles are written (served under /outputs/profiles)
+PROFILE_DIR = os.path.join("outputs", "profiles")
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+_active: ContextVar[Optional["SamplingProfiler"]] = ContextVar("active_profiler", default=None)
+
+class SamplingProfiler:
+    """
+    Periodically samples the Python stacks of threads currently inside a profiled
+    stage (see stage()), and records per-stage wall-clock timings. Samples are rooted
+    at the stage name, so the flamegraph splits by pipeline stage first.
+    """
+    def __init__(self, name: str = "request", interval: float = SAMPLE_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stage_timings: Dict[str, Dict[str, float]] = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+        # thread id -> stack of stage names currently open on that thread
+        self._stages: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                targets = {tid: names[-1] for tid, names in self._stages.items() if names}
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            for tid, stage_name in targets.items():
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(stage_name)
+                self.samples[tuple(reversed(stack))] += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        tid = threading.get_ident()
+        with self._lock:
+            self._stages.setdefault(tid, []).append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = self.stage_timings[name]
+            timing["seconds"] += time.perf_counter() - started
+            timing["calls"] += 1
+            with self._lock:
+                self._stages[tid].pop()
+                if not self._stages[tid]:
+                    del self._stages[tid]
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format: 'root;child;leaf count' per line."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Speedscope 'sampled' profile with one weighted entry per distinct stack."""
+        frame_index: Dict[str, int] = {}
+        frames: List[Dict[str, str]] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.samples.items():
+            indices = []
+            for name in stack:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    frames.append({"name": name})
+                indices.append(frame_index[name])
+            samples.append(indices)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "signai-sampling-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "duration_seconds": self.duration,
+            "samples": sum(self.samples.values()),
+            "sample_interval_seconds": self.interval,
+            "stage_timings": dict(self.stage_timings)
+        }
+
+    def save(self, directory: str = PROFILE_DIR, basename: Optional[str] = None) -> Tuple[str, str]:
+        """Writes <basename>.speedscope.json and <basename>.collapsed.txt; returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        basename = basename or f"profile_{uuid.uuid4().hex[:12]}"
+        speedscope_path = os.path.join(directory, f"{basename}.speedscope.json")
+        collapsed_path = os.path.join(directory, f"{basename}.collapsed.txt")
+        with open(speedscope_path, "w") as f:
+            json.dump(self.speedscope(), f)
+        with open(collapsed_path, "w") as f:
+            f.write(self.collapsed())
+        return speedscope_path, collapsed_path
+
+@contextmanager
+def profile(name: str = "request"):
+    """Activates a SamplingProfiler for the current context (and threads that copy it)."""
+    profiler = SamplingProfiler(name)
+    token = _active.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active.reset(token)
+        logger.info(f"Profile '{name}': {profiler.summary()['samples']} samples over {profiler.duration:.2f}s")
+
+@contextmanager
+def stage(name: str):
+    """Marks a pipeline stage for the active profiler; a no-op when profiling is off."""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+def is_active() -> bool:
+    return _active.get() is not None
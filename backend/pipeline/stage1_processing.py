@@ -1,12 +1,22 @@
 from fastapi import UploadFile
 import json
 import logging
+import codecs
+import re
 from io import BytesIO
-from typing import Dict, List, Any, Tuple
+import os
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
 
 # Import libraries for processing
 # pdfminer.six: Used for robust PDF text extraction.
-from pdfminer.high_level import extract_text as extract_text_from_pdf
+from pdfminer.high_level import extract_text as extract_text_from_pdf, extract_pages
+from pdfminer.layout import LAParams, LTChar, LTTextContainer
+from pdfminer.pdfdocument import PDFDocument, PDFNoOutlines
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.psparser import PSLiteral
 # python-docx: Standard library for reading .docx files.
 from docx import Document
 # python-pptx: Standard library for reading .pptx files.
@@ -14,10 +24,31 @@ from pptx import Presentation
 
 logger = logging.getLogger(__name__)
 
+# Read size for streaming text uploads
+TEXT_READ_CHUNK_SIZE = 64 * 1024
+
+# Markdown ATX heading ("# Title"), setext underline ("===" / "---") and list item markers
+ATX_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+SETEXT_UNDERLINE = re.compile(r"^\s{0,3}(=+|-+)\s*$")
+LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+
+# PDF layout heuristics: a text block is a heading when its average font size is at least
+# HEADING_SIZE_RATIO times the dominant body size and it is no longer than HEADING_MAX_WORDS.
+HEADING_SIZE_RATIO = 1.2
+HEADING_MAX_WORDS = 15
+# Split PDF chapters with more paragraphs than this into numbered parts (0 disables the cap)
+PDF_MAX_CHAPTER_PARAGRAPHS = int(os.environ.get("PDF_MAX_CHAPTER_PARAGRAPHS", "50"))
+# Leading PDF pages buffered to learn the body font size and running headers/footers
+PDF_LOOKAHEAD_PAGES = 5
+# Short blocks repeated on at least this many nearby pages are running headers/footers and are skipped
+RUNNING_TEXT_MIN_PAGES = 3
+# Largest page gap still counted as the same run of a repeated block (e.g. headers on odd pages only)
+RUNNING_TEXT_MAX_GAP = 2
+
 async def process_file(file: UploadFile) -> Dict[str, Any]:
     """
     Extracts text from the uploaded file and structures it.
-    Input: UploadFile (PDF, DOCX, PPTX)
+    Input: UploadFile (PDF, DOCX, PPTX, plain text / Markdown)
     Output: JSON structure with chapters/headings and paragraphs.
     
     Returns structure:
@@ -34,7 +65,6 @@ async def process_file(file: UploadFile) -> Dict[str, Any]:
     }
     """
     filename = file.filename.lower()
-    content = await file.read()
     
     data = {
         "filename": file.filename,
@@ -45,18 +75,14 @@ async def process_file(file: UploadFile) -> Dict[str, Any]:
         if filename.endswith(".pdf"):
             # Model/Library: pdfminer.six
             # Robust extraction of text from PDF streams
-            text = extract_text_pdf(content)
-            # Basic heuristic: Splitting by double newlines to simulate paragraphs/sections
-            paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-            data["chapters"].append({
-                "title": "Extracted Content", 
-                "paragraphs": paragraphs,
-                "raw_text": text
-            })
+            # Chapters come from the document outline, or font-size headings when there is none
+            content = await file.read()
+            data["chapters"] = extract_chapters_pdf(content)
             
         elif filename.endswith(".docx"):
             # Model/Library: python-docx
             # Extracts text from Word documents, preserving paragraph structure
+            content = await file.read()
             paragraphs, text = extract_text_docx(content)
             data["chapters"].append({
                 "title": "Extracted Content", 
@@ -67,18 +93,14 @@ async def process_file(file: UploadFile) -> Dict[str, Any]:
         elif filename.endswith(".pptx") or filename.endswith(".ppt"):
             # Model/Library: python-pptx
             # Extracts text from PowerPoint slides, treating each slide as a chapter
+            content = await file.read()
             slides = extract_text_pptx(content)
             data["chapters"] = slides
             
         else:
-            # Fallback for plain text files
-            text = content.decode("utf-8", errors="ignore")
-            paragraphs = [line.strip() for line in text.splitlines() if line.strip()]
-            data["chapters"].append({
-                "title": "Raw Text", 
-                "paragraphs": paragraphs,
-                "raw_text": text
-            })
+            # Fallback for plain text and Markdown files
+            # Streams the upload, splitting chapters on headings and merging wrapped lines
+            data["chapters"] = await extract_text_stream(file)
             
     except Exception as e:
         logger.error(f"Error processing file {filename}: {e}")
@@ -92,6 +114,234 @@ def extract_text_pdf(content: bytes) -> str:
         text = extract_text_from_pdf(stream)
     return text
 
+def extract_chapters_pdf(content: bytes, max_paragraphs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Extract chapters from PDF bytes using pdfminer layout analysis.
+    Top-level outline (bookmark) entries define chapter starts when present;
+    otherwise text blocks set in a noticeably larger font are treated as headings.
+    Chapters are built page by page (see PdfChapterBuilder). Chapters longer than
+    max_paragraphs are split into parts.
+    """
+    if max_paragraphs is None:
+        max_paragraphs = PDF_MAX_CHAPTER_PARAGRAPHS
+
+    with BytesIO(content) as stream:
+        outline_starts = _pdf_outline_starts(stream)
+        stream.seek(0)
+        builder = PdfChapterBuilder(outline_starts)
+        for page_idx, blocks in _iter_pdf_pages(stream):
+            builder.add_page(page_idx, blocks)
+        chapters = builder.finish()
+
+    if not chapters:
+        chapters = [{"title": "Extracted Content", "paragraphs": []}]
+
+    chapters = _cap_chapter_size(chapters, max_paragraphs)
+    for chapter in chapters:
+        chapter["raw_text"] = "\n\n".join(chapter["paragraphs"])
+    return chapters
+
+def _iter_pdf_pages(stream):
+    """Yields (page_index, [(text, average_font_size), ...]) for each page's text blocks, one page at a time."""
+    for page_idx, page in enumerate(extract_pages(stream, laparams=LAParams())):
+        blocks = []
+        for element in page:
+            if not isinstance(element, LTTextContainer):
+                continue
+            text = _clean_pdf_text(element.get_text())
+            # Drop empty blocks and bare page numbers
+            if not text or text.isdigit():
+                continue
+            sizes = [char.size for line in element for char in line if isinstance(char, LTChar)]
+            size = sum(sizes) / len(sizes) if sizes else 0.0
+            blocks.append((text, size))
+        yield page_idx, blocks
+
+def _clean_pdf_text(text: str) -> str:
+    # Re-join hyphenated line breaks, then collapse wrapped lines into one paragraph
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    return " ".join(text.split())
+
+def _pdf_outline_starts(stream) -> List[Tuple[int, str]]:
+    """Returns (page_index, title) for each top-level outline entry, in page order."""
+    try:
+        doc = PDFDocument(PDFParser(stream))
+        page_index = {page.pageid: i for i, page in enumerate(PDFPage.create_pages(doc))}
+        starts = {}
+        for level, title, dest, action, _ in doc.get_outlines():
+            if level != 1:
+                continue
+            page = _resolve_outline_page(doc, dest, action, page_index)
+            if page is not None and page not in starts:
+                starts[page] = title
+        return sorted(starts.items())
+    except PDFNoOutlines:
+        return []
+    except Exception as e:
+        logger.warning(f"Could not read PDF outline: {e}")
+        return []
+
+def _resolve_outline_page(doc, dest, action, page_index: Dict[int, int]) -> Optional[int]:
+    try:
+        if dest is None and action is not None:
+            action = resolve1(action)
+            if isinstance(action, dict):
+                dest = action.get("D")
+        dest = resolve1(dest)
+        # Named destinations
+        if isinstance(dest, PSLiteral):
+            dest = dest.name
+        if isinstance(dest, (str, bytes)):
+            dest = resolve1(doc.get_dest(dest))
+        if isinstance(dest, dict):
+            dest = resolve1(dest.get("D"))
+        if isinstance(dest, list) and dest:
+            return page_index.get(getattr(dest[0], "objid", None))
+    except Exception:
+        pass
+    return None
+
+def _numbered_key(text: str) -> str:
+    # Page numbers inside running footers ("Page 3 of 40") should not make them distinct
+    return re.sub(r"\d+", "#", text.lower())
+
+class PdfChapterBuilder:
+    """
+    Incrementally groups PDF text blocks into chapters, one page at a time.
+    Outline entries start chapters when given; otherwise headings are blocks set in a
+    noticeably larger font than the body. The first PDF_LOOKAHEAD_PAGES pages are held
+    back to learn the body font size and running headers/footers (short blocks repeated
+    on RUNNING_TEXT_MIN_PAGES nearby pages), which are then skipped on every page. Blocks
+    that differ only in their numbers ("Page 3", "Page 4") count as repeats unless they are
+    heading-sized, so numbered headings such as "Chapter 2", "Chapter 3" are kept. A
+    heading-sized running header still counts as a heading on the first page of its run,
+    so a chapter title repeated as the header of each of its pages opens the chapter once.
+    """
+    def __init__(self, outline_starts: Optional[List[Tuple[int, str]]] = None):
+        self.chapters: List[Dict[str, Any]] = []
+        self._starts = list(outline_starts or [])
+        self._use_outline = bool(self._starts)
+        self._title = "Extracted Content"
+        self._paragraphs: List[str] = []
+        self._pending: List[Tuple[int, List[Tuple[str, float]]]] = []
+        self._size_weights = Counter()
+        # (kind, key) -> (last page seen, length of its current run of nearby pages, first page of the run),
+        # kind being "exact" (lowercased text) or "numbered" (digits masked)
+        self._runs: Dict[Tuple[str, str], Tuple[int, int, int]] = {}
+        self._running = set()
+        self._pages_seen = 0
+        self._body_size: Optional[float] = None
+
+    def add_page(self, page_idx: int, blocks: List[Tuple[str, float]]):
+        self._pages_seen += 1
+        short = [text for text, _ in blocks if len(text.split()) <= HEADING_MAX_WORDS]
+        keys = {("exact", text.lower()) for text in short} | {("numbered", _numbered_key(text)) for text in short}
+        for key in keys:
+            last_page, run, run_start = self._runs.get(key, (None, 0, page_idx))
+            if last_page is not None and page_idx - last_page <= RUNNING_TEXT_MAX_GAP:
+                run += 1
+            else:
+                run, run_start = 1, page_idx
+            self._runs[key] = (page_idx, run, run_start)
+            if run >= RUNNING_TEXT_MIN_PAGES:
+                self._running.add(key)
+
+        if self._body_size is not None:
+            self._emit_page(page_idx, blocks)
+            return
+
+        # Dominant body font size, weighted by text length
+        for text, size in blocks:
+            self._size_weights[round(size, 1)] += len(text)
+        self._pending.append((page_idx, blocks))
+        if len(self._pending) >= PDF_LOOKAHEAD_PAGES:
+            self._flush_pending()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self._flush_pending()
+        self._end_chapter()
+        return self.chapters
+
+    def _flush_pending(self):
+        if self._body_size is None:
+            self._body_size = self._size_weights.most_common(1)[0][0] if self._size_weights else 0.0
+        pending, self._pending = self._pending, []
+        for page_idx, blocks in pending:
+            self._emit_page(page_idx, blocks)
+
+    def _is_running_text(self, text: str, size: float, page_idx: int) -> bool:
+        if len(text.split()) > HEADING_MAX_WORDS:
+            return False
+        exact = ("exact", text.lower())
+        if self._is_heading(text, size):
+            if not self._use_outline and self._runs.get(exact, (None, 0, None))[2] == page_idx:
+                return False
+            keys = [exact]
+        else:
+            keys = [exact, ("numbered", _numbered_key(text))]
+        for key in keys:
+            if key in self._running:
+                return True
+            # Documents shorter than RUNNING_TEXT_MIN_PAGES: a block on every page counts
+            if 1 < self._pages_seen < RUNNING_TEXT_MIN_PAGES and self._runs.get(key, (0, 0, 0))[1] >= self._pages_seen:
+                return True
+        return False
+
+    def _emit_page(self, page_idx: int, blocks: List[Tuple[str, float]]):
+        while self._use_outline and self._starts and self._starts[0][0] <= page_idx:
+            self._end_chapter()
+            self._title = self._starts.pop(0)[1]
+
+        for text, size in blocks:
+            if self._is_running_text(text, size, page_idx):
+                continue
+            if self._use_outline or not self._is_heading(text, size):
+                self._paragraphs.append(text)
+            else:
+                self._add_heading(text)
+
+    def _is_heading(self, text: str, size: float) -> bool:
+        return (
+            self._body_size > 0
+            and size >= self._body_size * HEADING_SIZE_RATIO
+            and len(text.split()) <= HEADING_MAX_WORDS
+        )
+
+    def _add_heading(self, text: str):
+        if text.lower() == self._title.lower():
+            # The chapter title repeated as a page header
+            return
+        if self._paragraphs:
+            self._end_chapter()
+            self._title = text
+        elif self._title == "Extracted Content":
+            self._title = text
+        else:
+            # Consecutive headings (e.g. "Chapter 3" followed by its name) form one title
+            self._title = f"{self._title} - {text}"
+
+    def _end_chapter(self):
+        if self._paragraphs:
+            self.chapters.append({"title": self._title, "paragraphs": self._paragraphs})
+            self._paragraphs = []
+
+def _cap_chapter_size(chapters: List[Dict[str, Any]], max_paragraphs: int) -> List[Dict[str, Any]]:
+    """Splits chapters with more than max_paragraphs paragraphs into '(part N)' chapters."""
+    if not max_paragraphs or max_paragraphs <= 0:
+        return chapters
+    capped = []
+    for chapter in chapters:
+        paragraphs = chapter["paragraphs"]
+        if len(paragraphs) <= max_paragraphs:
+            capped.append(chapter)
+            continue
+        for part, start in enumerate(range(0, len(paragraphs), max_paragraphs), start=1):
+            capped.append({
+                "title": f"{chapter['title']} (part {part})",
+                "paragraphs": paragraphs[start:start + max_paragraphs]
+            })
+    return capped
+
 def extract_text_docx(content: bytes) -> Tuple[List[str], str]:
     """Extract text from DOCX bytes using python-docx. Returns (paragraphs_list, full_text)."""
     with BytesIO(content) as stream:
@@ -126,3 +376,96 @@ def extract_text_pptx(content: bytes) -> List[Dict[str, Any]]:
                 "raw_text": "\n".join(slide_text)
             })
     return slides_data
+
+async def iter_upload_lines(file: UploadFile, chunk_size: int = TEXT_READ_CHUNK_SIZE):
+    """Yields decoded lines from an upload, reading it incrementally."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pending = ""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # Hold back a trailing partial line (or a lone "\r" that may precede "\n") until the next chunk
+        pending = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        for line in lines:
+            yield line.rstrip("\r\n")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r\n")
+
+class TextChapterBuilder:
+    """
+    Incrementally groups text lines into chapters and paragraphs.
+    Headings (Markdown ATX or setext) start a new chapter; consecutive non-blank
+    lines are merged into one paragraph; blank lines and list items break paragraphs.
+    """
+    def __init__(self, default_title: str = "Raw Text"):
+        self.chapters: List[Dict[str, Any]] = []
+        self._title = default_title
+        self._paragraphs: List[str] = []
+        self._lines: List[str] = []
+
+    def feed(self, line: str):
+        stripped = line.strip()
+
+        if not stripped:
+            self._end_paragraph()
+            return
+
+        heading = ATX_HEADING.match(line)
+        if heading:
+            self._start_chapter(heading.group(2))
+            return
+
+        if SETEXT_UNDERLINE.match(line):
+            # An underline below text turns the line directly above it into a heading
+            # (any earlier lines stay a paragraph of the previous chapter). Only "---"
+            # with no text above is a thematic break; a bare "===" is ignored.
+            if self._lines:
+                title = self._lines.pop()
+                self._start_chapter(title)
+            else:
+                self._end_paragraph()
+            return
+
+        if LIST_ITEM.match(line):
+            self._end_paragraph()
+            stripped = LIST_ITEM.sub("", line).strip()
+
+        # Re-join words hyphenated across wrapped lines
+        if self._lines and self._lines[-1].endswith("-") and stripped[:1].islower():
+            self._lines[-1] = self._lines[-1][:-1] + stripped
+        else:
+            self._lines.append(stripped)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self._end_chapter()
+        return self.chapters
+
+    def _end_paragraph(self):
+        if self._lines:
+            self._paragraphs.append(" ".join(self._lines))
+            self._lines = []
+
+    def _end_chapter(self):
+        self._end_paragraph()
+        if self._paragraphs:
+            self.chapters.append({
+                "title": self._title,
+                "paragraphs": self._paragraphs,
+                "raw_text": "\n".join(self._paragraphs)
+            })
+        self._paragraphs = []
+
+    def _start_chapter(self, title: str):
+        self._end_chapter()
+        self._title = title.strip() or self._title
+
+async def extract_text_stream(file: UploadFile) -> List[Dict[str, Any]]:
+    """Extract chapters from a plain text / Markdown upload without buffering the whole file."""
+    builder = TextChapterBuilder()
+    async for line in iter_upload_lines(file):
+        builder.feed(line)
+    return builder.finish()
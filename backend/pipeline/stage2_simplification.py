@@ -1,6 +1,11 @@
 from transformers import pipeline
+import argparse
+import json
 import logging
-from typing import Dict, List, Any
+import os
+import re
+import sys
+from typing import Dict, List, Any, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -9,12 +14,92 @@ logger = logging.getLogger(__name__)
 # compared to vanilla t5-small, while maintaining speed.
 MODEL_NAME = "google/flan-t5-small"
 
+# Inference backend for the simplifier, selected via SIMPLIFIER_BACKEND:
+#   "pytorch"   - stock fp32 transformers pipeline (default)
+#   "quantized" - PyTorch dynamic int8 quantization of the Linear layers
+#   "onnx"      - ONNX Runtime encoder-decoder export (requires optimum[onnxruntime])
+SIMPLIFIER_BACKEND = os.environ.get("SIMPLIFIER_BACKEND", "pytorch").lower()
+SUPPORTED_BACKENDS = ("pytorch", "quantized", "onnx")
+# Where the ONNX export is saved, so it happens once rather than on every import/worker
+ONNX_EXPORT_DIR = os.environ.get(
+    "SIMPLIFIER_ONNX_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "flan-t5-small-onnx"))
+)
+
+# T5-style prefixing is good practice, though FLAN handles prompts well.
+PROMPT_PREFIX = "simplify: "
+
+# Upper bound on model input tokens per segment (flan-t5 was trained on 512-token inputs)
+MAX_INPUT_TOKENS = int(os.environ.get("SIMPLIFIER_MAX_INPUT_TOKENS", "512"))
+# Number of segments sent to the model per generate call
+BATCH_SIZE = int(os.environ.get("SIMPLIFIER_BATCH_SIZE", "8"))
+
+# Sentence boundaries: terminal punctuation followed by whitespace, or line breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Lowest exact-match rate against PyTorch at which the parity check passes
+PARITY_MIN_MATCH_RATE = float(os.environ.get("SIMPLIFIER_PARITY_MIN_MATCH_RATE", "0.8"))
+
+# Fixed corpus used to compare an alternative backend against the PyTorch reference.
+PARITY_SAMPLES = [
+    "The mitochondria is the organelle responsible for producing most of the chemical energy needed by the cell.",
+    "Photosynthesis is the process by which green plants use sunlight to synthesize nutrients from carbon dioxide and water.",
+    "The French Revolution was a period of radical political and societal change in France that began in 1789.",
+    "An algorithm is a finite sequence of well-defined instructions used to solve a class of problems.",
+    "Students should submit their completed assignments before the deadline in order to receive full credit.",
+]
+
+def _load_summarizer(backend: str):
+    """Builds the summarization pipeline for the requested inference backend."""
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown simplifier backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+
+    if backend == "pytorch":
+        return pipeline("summarization", model=MODEL_NAME)
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    if backend == "quantized":
+        # Dynamic int8 quantization: weights are stored as int8 and activations are
+        # quantized on the fly, which cuts memory and CPU latency for the Linear-heavy T5 blocks.
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+        model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+    # ONNX Runtime: exports encoder and decoder-with-past graphs so generation reuses the KV cache.
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    if not os.path.exists(os.path.join(ONNX_EXPORT_DIR, "config.json")):
+        _export_onnx(ORTModelForSeq2SeqLM)
+    model = ORTModelForSeq2SeqLM.from_pretrained(ONNX_EXPORT_DIR, use_cache=True)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+def _export_onnx(model_class):
+    """Exports MODEL_NAME to ONNX_EXPORT_DIR via a temporary directory, so concurrent workers never see a partial export."""
+    import shutil
+    import tempfile
+    parent = os.path.dirname(ONNX_EXPORT_DIR)
+    os.makedirs(parent, exist_ok=True)
+    logger.info(f"Exporting {MODEL_NAME} to ONNX at {ONNX_EXPORT_DIR} (one-time)...")
+    staging = tempfile.mkdtemp(prefix=".onnx-export-", dir=parent)
+    try:
+        model = model_class.from_pretrained(MODEL_NAME, export=True, use_cache=True)
+        model.save_pretrained(staging)
+        try:
+            os.rename(staging, ONNX_EXPORT_DIR)
+        except OSError:
+            # Another worker finished its export first; use that one
+            if not os.path.exists(os.path.join(ONNX_EXPORT_DIR, "config.json")):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
 # Initialize the summarization pipeline globally
 try:
-    logger.info(f"Loading simplification model: {MODEL_NAME}...")
-    # 'text2text-generation' is often more flexible for T5, but 'summarization' pipeline works well too.
-    # explicit instantiation ensures we get the right behavior.
-    summarizer = pipeline("summarization", model=MODEL_NAME)
+    logger.info(f"Loading simplification model: {MODEL_NAME} (backend: {SIMPLIFIER_BACKEND})...")
+    summarizer = _load_summarizer(SIMPLIFIER_BACKEND)
     logger.info("Simplification model loaded successfully.")
 except Exception as e:
     logger.error(f"Failed to load simplification model: {e}")
@@ -26,40 +111,163 @@ def simplify_text(text: str) -> str:
     Input: Complex text string
     Output: Simplified text string
     """
-    if not text or not text.strip():
-        return ""
-    
+    return simplify_texts([text])[0]
+
+def simplify_texts(texts: List[str]) -> List[str]:
+    """
+    Simplifies a batch of texts. Each text is chunked on sentence boundaries into
+    segments that fit the model's input budget, all segments are simplified in
+    batches, and the results are stitched back together per text.
+    Input: List of complex text strings
+    Output: List of simplified text strings (same order)
+    """
     if not summarizer:
         logger.warning("Summarizer model not loaded, returning original text.")
-        return text 
-        
-    try:
-        # T5-style prefixing is good practice, though FLAN handles prompts well.
-        input_text = "simplify: " + text
-        
-        # Adjust max_length dynamically
-        input_len = len(input_text.split())
-        # Heuristics for summary length
-        max_len = max(10, int(input_len * 0.7)) 
-        min_len = max(3, int(input_len * 0.2))
-        
-        summary = summarizer(
-            input_text, 
-            max_new_tokens=max_len, 
-            min_new_tokens=min_len, 
-            do_sample=False,
-            truncation=True
-        )
-        return summary[0]['summary_text']
-        
-    except Exception as e:
-        logger.error(f"Error simplifying text: {e}")
-        return text
+        return [text if text and text.strip() else "" for text in texts]
+
+    # (text index, segment, token count) for every non-empty segment
+    segments = []
+    for idx, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        for chunk in chunk_text(text):
+            segments.append((idx, chunk, count_tokens(chunk)))
 
-def process_stage2(stage1_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Batch segments that share the same generation bounds, so no segment gets another's
+    # length cap; sorting by length first also keeps padding low
+    order = sorted(range(len(segments)), key=lambda i: segments[i][2])
+    batches = []
+    for i in order:
+        bounds = _length_bounds(segments[i][2])
+        if batches and batches[-1][0] == bounds and len(batches[-1][1]) < BATCH_SIZE:
+            batches[-1][1].append(i)
+        else:
+            batches.append((bounds, [i]))
+
+    simplified = [""] * len(segments)
+    for (max_len, min_len), batch in batches:
+        inputs = [PROMPT_PREFIX + segments[i][1] for i in batch]
+        try:
+            summaries = _run_summarizer(summarizer, inputs, max_len, min_len)
+            for i, summary in zip(batch, summaries):
+                simplified[i] = summary['summary_text']
+        except Exception as e:
+            logger.error(f"Error simplifying text: {e}")
+            for i in batch:
+                simplified[i] = segments[i][1]
+
+    stitched = [[] for _ in texts]
+    for (idx, _, _), result in zip(segments, simplified):
+        stitched[idx].append(result)
+    return [" ".join(parts) for parts in stitched]
+
+def count_tokens(text: str, model=None) -> int:
+    """Counts model tokens in text, falling back to whitespace words without a tokenizer."""
+    tokenizer = getattr(model or summarizer, "tokenizer", None)
+    if tokenizer is None:
+        return len(text.split())
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def _input_token_budget(model=None) -> int:
+    """Tokens available for segment text once the prompt prefix and EOS are accounted for."""
+    limit = MAX_INPUT_TOKENS
+    tokenizer = getattr(model or summarizer, "tokenizer", None)
+    if tokenizer is not None and tokenizer.model_max_length:
+        limit = min(limit, tokenizer.model_max_length)
+    return max(1, limit - count_tokens(PROMPT_PREFIX, model) - 1)
+
+def chunk_text(text: str, max_tokens: Optional[int] = None) -> List[str]:
+    """
+    Splits text on sentence boundaries into segments of at most max_tokens model tokens.
+    Sentences longer than the budget are split further on word boundaries.
+    """
+    max_tokens = max_tokens or _input_token_budget()
+    sentences = [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+    return _pack(sentences, max_tokens, split_oversized=True)
+
+def _pack(units: List[str], max_tokens: int, split_oversized: bool) -> List[str]:
+    """Greedily joins units into space-separated chunks that stay within max_tokens."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        n = count_tokens(unit)
+        if n > max_tokens and split_oversized:
+            if current:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_pack(unit.split(), max_tokens, split_oversized=False))
+            continue
+        if current and current_tokens + n > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _length_bounds(input_tokens: int):
+    """Heuristic (max_new_tokens, min_new_tokens) from the input's token count."""
+    max_len = max(10, int(input_tokens * 0.7))
+    min_len = max(3, int(input_tokens * 0.2))
+    return max_len, min_len
+
+def _run_summarizer(model, inputs, max_len: int, min_len: int):
+    # The pipeline defaults to batch_size=1, so a list would otherwise run one segment per generate call
+    batch_size = len(inputs) if isinstance(inputs, list) else 1
+    return model(
+        inputs, 
+        max_new_tokens=max_len, 
+        min_new_tokens=min_len, 
+        do_sample=False,
+        truncation=True,
+        batch_size=batch_size
+    )
+
+def check_backend_parity(backend: Optional[str] = None, samples: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compares the outputs of an inference backend against the PyTorch reference
+    on a fixed sample corpus.
+    Input: backend name (defaults to the configured one), optional sample texts
+    Output: Dict with exact-match rate and per-sample outputs
+    """
+    backend = (backend or SIMPLIFIER_BACKEND).lower()
+    samples = samples or PARITY_SAMPLES
+
+    reference = _load_summarizer("pytorch")
+    candidate = summarizer if backend == SIMPLIFIER_BACKEND and summarizer else _load_summarizer(backend)
+
+    results = []
+    for text in samples:
+        input_text = PROMPT_PREFIX + text
+        max_len, min_len = _length_bounds(count_tokens(text, reference))
+        expected = _run_summarizer(reference, input_text, max_len, min_len)[0]['summary_text']
+        actual = _run_summarizer(candidate, input_text, max_len, min_len)[0]['summary_text']
+        results.append({
+            "input": text,
+            "reference": expected,
+            "candidate": actual,
+            "match": expected.strip() == actual.strip()
+        })
+
+    matches = sum(1 for r in results if r["match"])
+    match_rate = matches / len(results) if results else 1.0
+    logger.info(f"Backend parity for '{backend}': {matches}/{len(results)} exact matches.")
+    return {
+        "backend": backend,
+        "match_rate": match_rate,
+        "samples": results
+    }
+
+def process_stage2(
+    stage1_data: Dict[str, Any],
+    simplify: Callable[[List[str]], List[str]] = simplify_texts
+) -> Dict[str, Any]:
     """
     Process extracted content from Stage 1.
-    Input: Output from stage1_processing (Dict with 'chapters')
+    Input: Output from stage1_processing (Dict with 'chapters'); optionally the batch
+           simplification function (e.g. a precomputed lookup for bulk runs)
     Output: Dict with 'simplified_chapters'
     """
     simplified_chapters = []
@@ -75,17 +283,16 @@ def process_stage2(stage1_data: Dict[str, Any]) -> Dict[str, Any]:
 
         # Process individual paragraphs if available (preferred)
         if "paragraphs" in chapter and chapter["paragraphs"]:
-            for p in chapter["paragraphs"]:
-                # specific filter to avoid simplifying very short snippets multiple times
-                if len(p.split()) > 5:
-                    simple_p = simplify_text(p)
-                    simplified_chapter["simplified_paragraphs"].append(simple_p)
-                else:
-                    simplified_chapter["simplified_paragraphs"].append(p)
+            paragraphs = list(chapter["paragraphs"])
+            # specific filter to avoid simplifying very short snippets multiple times
+            to_simplify = [i for i, p in enumerate(paragraphs) if len(p.split()) > 5]
+            for i, simple_p in zip(to_simplify, simplify([paragraphs[i] for i in to_simplify])):
+                paragraphs[i] = simple_p
+            simplified_chapter["simplified_paragraphs"].extend(paragraphs)
         else:
             # Fallback if no paragraph structure
             full_text = chapter.get("raw_text", "")
-            simple_text = simplify_text(full_text)
+            simple_text = simplify([full_text])[0]
             simplified_chapter["simplified_paragraphs"].append(simple_text)
 
         # Create a joined simplified text for convenience
@@ -93,3 +300,30 @@ def process_stage2(stage1_data: Dict[str, Any]) -> Dict[str, Any]:
         simplified_chapters.append(simplified_chapter)
         
     return {"simplified_chapters": simplified_chapters}
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage 2 simplifier utilities.")
+    parser.add_argument(
+        "--parity",
+        nargs="?",
+        const=SIMPLIFIER_BACKEND,
+        choices=SUPPORTED_BACKENDS,
+        help="Compare a backend (default: SIMPLIFIER_BACKEND) against the PyTorch reference."
+    )
+    parser.add_argument("--min-match-rate", type=float, default=PARITY_MIN_MATCH_RATE)
+    args = parser.parse_args()
+
+    if not args.parity:
+        parser.error("nothing to do; pass --parity [backend]")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = check_backend_parity(args.parity)
+    print(json.dumps(report, indent=2))
+    if report["match_rate"] < args.min_match_rate:
+        print(f"Parity check failed: {report['match_rate']:.0%} < {args.min_match_rate:.0%}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Parity check passed: {report['match_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import spacy
 import logging
-from typing import Dict, List, Any
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Callable, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,47 @@ except Exception:
         logger.error(f"Could not download spacy model: {e}. Translation will be degraded.")
         nlp = None
 
+# Maximum number of distinct normalized sentences (and, separately, paragraphs) kept in the gloss memo caches
+GLOSS_CACHE_SIZE = int(os.environ.get("GLOSS_CACHE_SIZE", "4096"))
+
+# --- Rule tables -----------------------------------------------------------
+# Rules are evaluated against spaCy's integer attribute IDs (token.pos, token.lower)
+# and precompiled frozensets so the per-token loop does no list scans or string builds.
+#
+# TOKEN_DROP_RULES: (pos_ids, lowercase_words) pairs; a token matching both is dropped.
+# TOKEN_RENDERERS: pos_id -> callable(token) producing the gloss string for that token.
+# SENTENCE_RULES: callables(list of (token, gloss)) -> list of (token, gloss), applied
+#   in order after token rendering; this is where reordering rules such as
+#   topicalization or time-first ordering are plugged in.
+
+def _string_ids(words) -> frozenset:
+    return frozenset(nlp.vocab.strings.add(w) for w in words)
+
+if nlp:
+    from spacy.symbols import DET, PUNCT, PART, VERB
+
+    TOKEN_DROP_RULES = (
+        # Skip articles and punctuation
+        (frozenset({DET, PUNCT}), _string_ids(["a", "an", "the", ".", ",", "?", "!"])),
+        # Skip 'to' particle
+        (frozenset({PART}), _string_ids(["to"])),
+    )
+    TOKEN_RENDERERS = {
+        # Use lemma for verbs (e.g., 'running' -> 'RUN')
+        VERB: lambda token: token.lemma_.upper(),
+    }
+else:
+    TOKEN_DROP_RULES = ()
+    TOKEN_RENDERERS = {}
+
+SENTENCE_RULES: List[Callable[[List[Tuple[Any, str]]], List[Tuple[Any, str]]]] = []
+
+def _default_render(token) -> str:
+    return token.text.upper()
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
 def text_to_gloss(text: str) -> str:
     """
     Converts English text to ASL Gloss.
@@ -30,6 +75,7 @@ def text_to_gloss(text: str) -> str:
     3. Remove 'to' markers
     4. Simple Subject-Object-Verb (SOV) reordering attempts (basic)
     5. Uppercase everything
+    Results are memoized per normalized sentence (LRU, GLOSS_CACHE_SIZE entries).
     """
     if not text:
         return ""
@@ -37,58 +83,102 @@ def text_to_gloss(text: str) -> str:
     if not nlp:
         # Fallback: uppercase and basic split
         return text.upper()
-    
-    doc = nlp(text)
-    gloss_tokens = []
-    
+
+    text = _normalize(text)
+    cached = _sentence_cache_get(text)
+    if cached is not None:
+        return cached
+    return _sentence_cache_put(text, gloss_doc(nlp(text)))
+
+# Normalized sentence -> gloss, least recently used first. A plain LRU rather than
+# lru_cache so paragraph glossing can look sentences up without parsing them again.
+_sentence_cache: "OrderedDict[str, str]" = OrderedDict()
+_sentence_cache_lock = threading.Lock()
+_sentence_cache_stats = {"hits": 0, "misses": 0}
+
+def _sentence_cache_get(text: str):
+    with _sentence_cache_lock:
+        gloss = _sentence_cache.get(text)
+        if gloss is None:
+            _sentence_cache_stats["misses"] += 1
+            return None
+        _sentence_cache.move_to_end(text)
+        _sentence_cache_stats["hits"] += 1
+        return gloss
+
+def _sentence_cache_put(text: str, gloss: str) -> str:
+    with _sentence_cache_lock:
+        _sentence_cache[text] = gloss
+        while len(_sentence_cache) > GLOSS_CACHE_SIZE:
+            _sentence_cache.popitem(last=False)
+    return gloss
+
+def gloss_cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counts and sizes of the paragraph and sentence gloss caches."""
+    with _sentence_cache_lock:
+        sentences = {**_sentence_cache_stats, "maxsize": GLOSS_CACHE_SIZE, "currsize": len(_sentence_cache)}
+    return {
+        "paragraphs": _cached_paragraph_gloss.cache_info()._asdict(),
+        "sentences": sentences
+    }
+
+def gloss_doc(doc) -> str:
+    """Applies the rule tables to an already-parsed spaCy Doc or Span."""
+    drop_rules = TOKEN_DROP_RULES
+    renderers = TOKEN_RENDERERS
+    glossed = []
+
     for token in doc:
-        # Skip articles and punctuation
-        if token.pos_ in ["DET", "PUNCT"] and token.text.lower() in ["a", "an", "the", ".", ",", "?", "!"]:
-            continue
-            
-        # Skip 'to' particle
-        if token.text.lower() == "to" and token.pos_ == "PART":
+        pos = token.pos
+        lower = token.lower
+        if any(pos in pos_ids and lower in word_ids for pos_ids, word_ids in drop_rules):
             continue
-            
-        # Use lemma for verbs (e.g., 'running' -> 'RUN')
-        if token.pos_ == "VERB":
-            gloss_tokens.append(token.lemma_.upper())
-        elif token.lemma_ == "-PRON-":
-             gloss_tokens.append(token.text.upper())
-        else:
-            gloss_tokens.append(token.text.upper())
-            
-    return " ".join(gloss_tokens)
+        render = renderers.get(pos, _default_render)
+        glossed.append((token, render(token)))
+
+    for rule in SENTENCE_RULES:
+        glossed = rule(glossed)
+
+    return " ".join(gloss for _, gloss in glossed)
 
 def process_paragraph_to_gloss(paragraph: str) -> str:
     """
     Splits a paragraph into sentences and creates a gloss representation.
     Returns: A single string containing the glossed paragraph.
+    Results are memoized per normalized paragraph, checked before any parsing.
     """
     if not paragraph or not paragraph.strip():
         return ""
 
-    if nlp:
-        doc = nlp(paragraph)
-        sentences = doc.sents
-    else:
+    if not nlp:
         # Fallback splitting
-        sentences = paragraph.split('. ')
+        return " ".join(s.upper() for s in paragraph.split('. ') if s)
+
+    return _cached_paragraph_gloss(_normalize(paragraph))
 
+@lru_cache(maxsize=GLOSS_CACHE_SIZE)
+def _cached_paragraph_gloss(paragraph: str) -> str:
+    # One parse per paragraph; sentences repeated from other paragraphs come from the
+    # sentence cache, new ones are glossed from their Spans in this paragraph's context
     gloss_sentences = []
-    for sent in sentences:
-        # sent is a Span if using spacy, need .text
-        text = sent.text if hasattr(sent, 'text') else sent
-        glossed_sent = text_to_gloss(text)
+    for sent in nlp(paragraph).sents:
+        text = _normalize(sent.text)
+        glossed_sent = _sentence_cache_get(text)
+        if glossed_sent is None:
+            glossed_sent = _sentence_cache_put(text, gloss_doc(sent))
         if glossed_sent:
             gloss_sentences.append(glossed_sent)
             
     return " ".join(gloss_sentences)
 
-def process_stage3(stage2_data: Dict[str, Any]) -> Dict[str, Any]:
+def process_stage3(
+    stage2_data: Dict[str, Any],
+    gloss: Callable[[str], str] = process_paragraph_to_gloss
+) -> Dict[str, Any]:
     """
     Process simplified content from Stage 2.
-    Input: Output from stage2_simplification (Dict with 'simplified_chapters')
+    Input: Output from stage2_simplification (Dict with 'simplified_chapters'); optionally
+           the paragraph gloss function (e.g. a precomputed lookup for bulk runs)
     Output: Dict with 'gloss_chapters'
     """
     gloss_chapters = []
@@ -105,12 +195,12 @@ def process_stage3(stage2_data: Dict[str, Any]) -> Dict[str, Any]:
         # Process using simplified_paragraphs if available
         if "simplified_paragraphs" in chapter and chapter["simplified_paragraphs"]:
             for p in chapter["simplified_paragraphs"]:
-                glossed_p = process_paragraph_to_gloss(p)
+                glossed_p = gloss(p)
                 gloss_chapter["glossed_paragraphs"].append(glossed_p)
         else:
             # Fallback for monolithic text
             full_text = chapter.get("simplified_text", "")
-            glossed_text = process_paragraph_to_gloss(full_text)
+            glossed_text = gloss(full_text)
             gloss_chapter["glossed_paragraphs"].append(glossed_text)
             
         # Create a joined sequence for convenience/compatibility
@@ -2,35 +2,107 @@ import json
 import logging
 import os
 import random
+import threading
+from collections import OrderedDict
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Fixed channel layout used when frames are packed into arrays:
+# 3 Euler channels per bone in BONE_ORDER, followed by FACE_CHANNELS.
+BONE_ORDER = [
+    "mixamorigHead",
+    "mixamorigNeck",
+    "mixamorigSpine",
+    "mixamorigRightShoulder",
+    "mixamorigRightArm",
+    "mixamorigRightForeArm",
+    "mixamorigRightHand",
+    "mixamorigLeftShoulder",
+    "mixamorigLeftArm",
+    "mixamorigLeftForeArm",
+    "mixamorigLeftHand",
+]
+FACE_CHANNELS = ["head_pitch"]
+FLOATS_PER_FRAME = len(BONE_ORDER) * 3 + len(FACE_CHANNELS)
+
+# Frame rate of dictionary/synthetic sequences and the default output rate
+SOURCE_FPS = 30
+DEFAULT_FPS = 30
+# Transition length between signs, in source frames
+TRANSITION_FRAMES = 10
+# Frames whose motion energy is below this fraction of the sign's peak count as idle
+IDLE_ENERGY_RATIO = 0.05
+# Retimed signs kept per (gloss, fps, speed); speed is client-supplied, so the cache is an LRU
+RETIMED_CACHE_SIZE = int(os.environ.get("RETIMED_CACHE_SIZE", "2048"))
+
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "dataset"))
+# Raw per-gloss frames written by extract_pose_from_videos
+POSE_CACHE_PATH = os.path.join(DATASET_DIR, "pose_cache.json")
+# Output of compile_pose_cache.py; preferred over POSE_CACHE_PATH unless that is newer
+COMPILED_CACHE_PATH = os.path.join(DATASET_DIR, "pose_cache.compiled.npz")
+
+# Bone names matching Mixamo standard
+BONE_NAMES = {
+    "head": "mixamorigHead",
+    "neck": "mixamorigNeck",
+    "spine": "mixamorigSpine",
+    "r_shoulder": "mixamorigRightShoulder",
+    "r_arm": "mixamorigRightArm",
+    "r_forearm": "mixamorigRightForeArm",
+    "r_hand": "mixamorigRightHand",
+    "l_shoulder": "mixamorigLeftShoulder",
+    "l_arm": "mixamorigLeftArm",
+    "l_forearm": "mixamorigLeftForeArm",
+    "l_hand": "mixamorigLeftHand"
+}
+
+# (frames, first frame array, last frame array); the arrays are None for an empty sign
+Sign = Tuple[List[Dict[str, Any]], Optional[np.ndarray], Optional[np.ndarray]]
+
 class SkeletalPoseGenerator:
     """
     Generates Bone Rotations (Euler Radians) for Mixamo-based rigs.
     """
     def __init__(self):
-        # Bone names matching Mixamo standard
-        self.bone_names = {
-            "head": "mixamorigHead",
-            "neck": "mixamorigNeck",
-            "spine": "mixamorigSpine",
-            "r_shoulder": "mixamorigRightShoulder",
-            "r_arm": "mixamorigRightArm",
-            "r_forearm": "mixamorigRightForeArm",
-            "r_hand": "mixamorigRightHand",
-            "l_shoulder": "mixamorigLeftShoulder",
-            "l_arm": "mixamorigLeftArm",
-            "l_forearm": "mixamorigLeftForeArm",
-            "l_hand": "mixamorigLeftHand"
-        }
-        self.pose_dictionary = self._load_pose_dictionary()
+        self.bone_names = BONE_NAMES
+        # gloss -> (packed frames, first, last) from the compiled cache
+        self.compiled: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.sign_stats: Dict[str, Dict[str, Any]] = {}
+        self._load_compiled_cache()
+        self.pose_dictionary = {} if self.compiled else self._load_pose_dictionary()
+        # (gloss, fps, speed) -> retimed dictionary sign, least recently used first
+        self._retimed: "OrderedDict[tuple, Sign]" = OrderedDict()
+        self._retimed_lock = threading.Lock()
+
+    def _load_compiled_cache(self):
+        if not os.path.exists(COMPILED_CACHE_PATH):
+            return
+        if os.path.exists(POSE_CACHE_PATH) and os.path.getmtime(POSE_CACHE_PATH) > os.path.getmtime(COMPILED_CACHE_PATH):
+            # e.g. after extract_pose_from_videos --append; the compiled cache would miss the new glosses
+            logger.warning("pose_cache.json is newer than the compiled pose cache; using the JSON. Rerun compile_pose_cache.py.")
+            return
+        try:
+            with np.load(COMPILED_CACHE_PATH, allow_pickle=False) as data:
+                if data["bones"].tolist() != BONE_ORDER or data["face"].tolist() != FACE_CHANNELS:
+                    logger.warning("Compiled pose cache has a different channel layout; recompile it.")
+                    return
+                frames, offsets = data["frames"], data["offsets"]
+                first, last = data["first"], data["last"]
+                glosses = data["glosses"].tolist()
+                self.sign_stats = json.loads(str(data["stats"]))
+            self.compiled = {
+                gloss: (frames[offsets[i]:offsets[i + 1]], first[i], last[i])
+                for i, gloss in enumerate(glosses)
+            }
+            logger.info(f"Loaded compiled pose cache with {len(self.compiled)} signs.")
+        except Exception as exc:
+            logger.warning("Failed to load compiled pose cache: %s", exc)
+            self.compiled = {}
 
     def _load_pose_dictionary(self) -> Dict[str, List[Dict[str, Any]]]:
-        cache_path = os.path.join(os.path.dirname(__file__), "..", "dataset", "pose_cache.json")
-        cache_path = os.path.abspath(cache_path)
+        cache_path = POSE_CACHE_PATH
         if os.path.exists(cache_path):
             try:
                 with open(cache_path, "r") as f:
@@ -47,16 +119,7 @@ class SkeletalPoseGenerator:
         }
 
     def _get_base_pose(self) -> Dict[str, List[float]]:
-        """Returns the 'Neutral' Sign Language pose (Arms down, hands forward)."""
-        return {
-            self.bone_names["r_arm"]: [0, 0, -1.2], # Drop right arm
-            self.bone_names["l_arm"]: [0, 0, 1.2],  # Drop left arm
-            self.bone_names["r_forearm"]: [0, 0.8, 0], # Bring right hand forward
-            self.bone_names["l_forearm"]: [0, -0.8, 0], # Bring left hand forward
-            self.bone_names["r_hand"]: [0, 0, 0],
-            self.bone_names["l_hand"]: [0, 0, 0],
-            self.bone_names["spine"]: [0.1, 0, 0] # Slight forward lean
-        }
+        return base_pose()
 
     def _generate_neutral_sequence(self, length: int) -> List[Dict[str, Any]]:
         frames = []
@@ -108,12 +171,43 @@ class SkeletalPoseGenerator:
             })
         return frames
 
-    def get_pose_for_gloss(self, gloss: str) -> List[Dict[str, Any]]:
+    def get_pose_for_gloss(self, gloss: str, fps: int = DEFAULT_FPS, speed: float = 1.0) -> List[Dict[str, Any]]:
+        """Returns the sign frames for a gloss at the requested frame rate and speed."""
+        return self.get_sign(gloss, fps, speed)[0]
+
+    def get_sign(self, gloss: str, fps: int = DEFAULT_FPS, speed: float = 1.0) -> Sign:
+        """
+        Returns (frames, first, last) for a gloss. Compiled signs only need resampling;
+        raw dictionary signs are trimmed of idle lead-in/lead-out first. Both are cached
+        per (gloss, fps, speed), up to RETIMED_CACHE_SIZE entries. Unknown glosses are finger-spelled.
+        """
         gloss = gloss.upper().strip()
-        if gloss in self.pose_dictionary:
-            return self.pose_dictionary[gloss]
+        key = (gloss, fps, speed)
+        with self._retimed_lock:
+            if key in self._retimed:
+                self._retimed.move_to_end(key)
+                return self._retimed[key]
 
-        return self._finger_spell_sequence(gloss)
+        if gloss in self.compiled:
+            packed, first, last = self.compiled[gloss]
+            # Linear resampling keeps the end frames, so the precomputed endpoints stay valid
+            packed = resample_frames(packed.astype(np.float64), SOURCE_FPS, fps, speed)
+            sign = (array_to_frames(packed), first, last)
+        elif gloss in self.pose_dictionary:
+            packed = trim_idle_frames(frames_to_array(self.pose_dictionary[gloss], dtype=np.float64))
+            packed = resample_frames(packed, SOURCE_FPS, fps, speed)
+            sign = (array_to_frames(packed), *_endpoints(packed))
+        else:
+            sequence = self._finger_spell_sequence(gloss)
+            if fps != SOURCE_FPS or speed != 1.0:
+                sequence = array_to_frames(resample_frames(frames_to_array(sequence, dtype=np.float64), SOURCE_FPS, fps, speed))
+            return (sequence, *_endpoints(frames_to_array(sequence[:1] + sequence[-1:], dtype=np.float64)))
+
+        with self._retimed_lock:
+            self._retimed[key] = sign
+            while len(self._retimed) > RETIMED_CACHE_SIZE:
+                self._retimed.popitem(last=False)
+        return sign
 
     def _generate_random_rotations(self, text: str) -> List[Dict[str, Any]]:
         frames = []
@@ -144,34 +238,160 @@ class SkeletalPoseGenerator:
     def interpolate_sequences(self, seq1: List[Dict], seq2: List[Dict], steps: int = 10) -> List[Dict]:
         """Interpolates bone rotations between sequences."""
         if not seq1 or not seq2: return []
-        
-        start_bones = seq1[-1].get("bones", {})
-        end_bones = seq2[0].get("bones", {})
-        
-        transition_frames = []
-        all_bone_keys = set(start_bones.keys()) | set(end_bones.keys())
-        
-        for i in range(1, steps + 1):
-            alpha = i / (steps + 1)
-            interp_bones = {}
-            for bone in all_bone_keys:
-                b1 = start_bones.get(bone, [0, 0, 0])
-                b2 = end_bones.get(bone, [0, 0, 0])
-                interp_bones[bone] = [
-                    b1[0] * (1 - alpha) + b2[0] * alpha,
-                    b1[1] * (1 - alpha) + b2[1] * alpha,
-                    b1[2] * (1 - alpha) + b2[2] * alpha
-                ]
-            transition_frames.append({"bones": interp_bones, "type": "transition"})
-            
-        return transition_frames
+        endpoints = frames_to_array([seq1[-1], seq2[0]], dtype=np.float64)
+        return interpolate_arrays(endpoints[0], endpoints[1], steps)
+
+def base_pose() -> Dict[str, List[float]]:
+    """Returns the 'Neutral' Sign Language pose (Arms down, hands forward)."""
+    return {
+        BONE_NAMES["r_arm"]: [0, 0, -1.2], # Drop right arm
+        BONE_NAMES["l_arm"]: [0, 0, 1.2],  # Drop left arm
+        BONE_NAMES["r_forearm"]: [0, 0.8, 0], # Bring right hand forward
+        BONE_NAMES["l_forearm"]: [0, -0.8, 0], # Bring left hand forward
+        BONE_NAMES["r_hand"]: [0, 0, 0],
+        BONE_NAMES["l_hand"]: [0, 0, 0],
+        BONE_NAMES["spine"]: [0.1, 0, 0] # Slight forward lean
+    }
+
+def neutral_pose_array() -> np.ndarray:
+    """The neutral pose packed as one row; channels without a neutral value are zero."""
+    neutral = {"bones": base_pose(), "face": {"head_pitch": 0.0}}
+    return np.nan_to_num(frames_to_array([neutral], dtype=np.float64)[0])
+
+def frames_to_array(frames: List[Dict[str, Any]], dtype=np.float32) -> np.ndarray:
+    """
+    Packs frames into an array of shape (len(frames), FLOATS_PER_FRAME).
+    Bones or face channels absent from a frame are NaN, so consumers can skip them.
+    """
+    packed = np.full((len(frames), FLOATS_PER_FRAME), np.nan, dtype=dtype)
+    bone_offset = {name: i * 3 for i, name in enumerate(BONE_ORDER)}
+    face_offset = {name: len(BONE_ORDER) * 3 + i for i, name in enumerate(FACE_CHANNELS)}
+    for row, frame in enumerate(frames):
+        for bone, rotation in frame.get("bones", {}).items():
+            offset = bone_offset.get(bone)
+            if offset is not None:
+                packed[row, offset:offset + 3] = rotation[:3]
+        for channel, value in frame.get("face", {}).items():
+            offset = face_offset.get(channel)
+            if offset is not None:
+                packed[row, offset] = value
+    return packed
 
-# Singleton instance
-generator = SkeletalPoseGenerator()
+def array_to_frames(packed: np.ndarray) -> List[Dict[str, Any]]:
+    """Inverse of frames_to_array; NaN channels are left out of the frame dicts."""
+    frames = []
+    face_start = len(BONE_ORDER) * 3
+    for row in packed.tolist():
+        bones = {}
+        for i, bone in enumerate(BONE_ORDER):
+            rotation = row[i * 3:i * 3 + 3]
+            if rotation[0] == rotation[0]:  # not NaN
+                bones[bone] = rotation
+        face = {name: row[face_start + i] for i, name in enumerate(FACE_CHANNELS) if row[face_start + i] == row[face_start + i]}
+        frames.append({"bones": bones, "face": face} if face else {"bones": bones})
+    return frames
 
-def process_stage4(gloss_data: Dict[str, Any]) -> Dict[str, Any]:
+def _endpoints(packed: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    if not len(packed):
+        return None, None
+    return packed[0], packed[-1]
+
+def motion_energy(packed: np.ndarray) -> np.ndarray:
+    """energy[i] is the squared rotation change between frame i and i + 1 (NaN channels ignored)."""
+    return np.nansum(np.diff(packed, axis=0) ** 2, axis=1)
+
+def active_bounds(packed: np.ndarray, ratio: float = IDLE_ENERGY_RATIO) -> Tuple[int, int]:
+    """
+    [start, end) frame range left after dropping idle lead-in/lead-out, where the motion
+    energy stays below ratio * the sequence's peak. Static sequences keep every frame.
+    """
+    if len(packed) < 3:
+        return 0, len(packed)
+    energy = motion_energy(packed)
+    peak = energy.max()
+    if peak < 1e-9:
+        return 0, len(packed)
+    active = np.flatnonzero(energy > peak * ratio)
+    return int(active[0]), int(active[-1]) + 2
+
+def trim_idle_frames(packed: np.ndarray, ratio: float = IDLE_ENERGY_RATIO) -> np.ndarray:
+    """Drops idle lead-in/lead-out frames (see active_bounds)."""
+    start, end = active_bounds(packed, ratio)
+    return packed[start:end]
+
+def interpolate_arrays(start: np.ndarray, end: np.ndarray, steps: int = 10) -> List[Dict[str, Any]]:
+    """
+    Transition frames blending two packed frames. Bone channels missing on one side
+    blend from/to zero; channels missing on both sides stay absent. Face channels are not carried.
+    """
+    start = start.astype(np.float64)
+    end = end.astype(np.float64)
+    absent = np.isnan(start) & np.isnan(end)
+    absent[len(BONE_ORDER) * 3:] = True
+    alpha = (np.arange(1, steps + 1) / (steps + 1))[:, None]
+    blended = np.nan_to_num(start) * (1 - alpha) + np.nan_to_num(end) * alpha
+    blended[:, absent] = np.nan
+    frames = array_to_frames(blended)
+    for frame in frames:
+        frame["type"] = "transition"
+    return frames
+
+def resample_frames(packed: np.ndarray, source_fps: float, target_fps: float, speed: float = 1.0) -> np.ndarray:
+    """Linearly resamples a packed sequence to target_fps, played back speed times faster."""
+    count = len(packed)
+    if count < 2 or (source_fps == target_fps and speed == 1.0):
+        return packed
+    duration = (count - 1) / (source_fps * speed)
+    new_count = max(2, int(round(duration * target_fps)) + 1)
+    positions = np.linspace(0.0, count - 1, new_count)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, count - 1)
+    weight = (positions - lower)[:, None]
+    return packed[lower] * (1.0 - weight) + packed[upper] * weight
+
+def transition_steps(fps: int = DEFAULT_FPS, speed: float = 1.0) -> int:
+    """Transition frames between signs at the given frame rate and speed."""
+    return max(1, int(round(TRANSITION_FRAMES * fps / (SOURCE_FPS * speed))))
+
+_generator: Optional[SkeletalPoseGenerator] = None
+_generator_lock = threading.Lock()
+
+def get_generator() -> SkeletalPoseGenerator:
+    """Singleton instance, built (loading the pose cache) on first use rather than at import."""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = SkeletalPoseGenerator()
+        return _generator
+
+def iter_gloss_signs(gloss_paragraph: str, fps: int = DEFAULT_FPS, speed: float = 1.0):
+    """
+    Yields the frames for each gloss word in turn (preceded by the transition
+    from the previous sign), so consumers can start before the whole paragraph is built.
+    """
+    steps = transition_steps(fps, speed)
+    generator = get_generator()
+    previous_last = None
+    for word in gloss_paragraph.split():
+        word_seq, first, last = generator.get_sign(word, fps, speed)
+        frames = []
+        if previous_last is not None and first is not None:
+            frames.extend(interpolate_arrays(previous_last, first, steps))
+        frames.extend(word_seq)
+        if last is not None:
+            previous_last = last
+        yield frames
+
+def build_gloss_sequence(gloss_paragraph: str, fps: int = DEFAULT_FPS, speed: float = 1.0) -> List[Dict[str, Any]]:
+    """Builds the full frame sequence for a glossed paragraph."""
+    full_sequence = []
+    for frames in iter_gloss_signs(gloss_paragraph, fps, speed):
+        full_sequence.extend(frames)
+    return full_sequence
+
+def process_stage4(gloss_data: Dict[str, Any], fps: int = DEFAULT_FPS, speed: float = 1.0) -> Dict[str, Any]:
     pose_chapters = []
-    logger.info("Processing Stage 4: Gloss to Skeletal Pose...")
+    logger.info(f"Processing Stage 4: Gloss to Skeletal Pose at {fps} fps (speed x{speed})...")
     
     for chapter in gloss_data.get("gloss_chapters", []):
         chapter_title = chapter.get("title", "Untitled")
@@ -179,24 +399,15 @@ def process_stage4(gloss_data: Dict[str, Any]) -> Dict[str, Any]:
         
         chapter_poses = []
         for para_idx, gloss_paragraph in enumerate(gloss_paragraphs):
-            words = gloss_paragraph.split()
-            full_sequence = []
-            
-            for word in words:
-                word_seq = generator.get_pose_for_gloss(word)
-                if full_sequence:
-                    transition = generator.interpolate_sequences(full_sequence, word_seq)
-                    full_sequence.extend(transition)
-                full_sequence.extend(word_seq)
-            
             chapter_poses.append({
                 "paragraph_index": para_idx,
                 "original_gloss": gloss_paragraph,
-                "pose_data": full_sequence
+                "pose_data": build_gloss_sequence(gloss_paragraph, fps, speed)
             })
             
         pose_chapters.append({
             "title": chapter_title,
+            "fps": fps,
             "sentences_poses": chapter_poses
         })
         
@@ -1,12 +1,24 @@
 import logging
 import os
 import json
+import re
 import uuid
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+# Optional faster serializer
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Decimal places kept for rotation values written to animation files
+ANIMATION_FLOAT_PRECISION = int(os.environ.get("ANIMATION_FLOAT_PRECISION", "4"))
+# Characters read at a time when streaming an animation file back
+ANIMATION_READ_BLOCK = 64 * 1024
+
 class NumpyEncoder(json.JSONEncoder):
     """Custom encoder for numpy data types."""
     def default(self, obj):
@@ -16,72 +28,200 @@ class NumpyEncoder(json.JSONEncoder):
             return obj.tolist()
         return super(NumpyEncoder, self).default(obj)
 
-def save_animation_json(pose_data: List[Dict], output_path: str, fps: int = 30):
+def _round_floats(obj: Any, precision: int) -> Any:
+    """Recursively rounds floats (including numpy scalars/arrays) to the given precision."""
+    if isinstance(obj, float):
+        return round(obj, precision)
+    if isinstance(obj, (np.integer, np.floating)):
+        return round(float(obj), precision)
+    if isinstance(obj, np.ndarray):
+        return np.round(obj.astype(float), precision).tolist()
+    if isinstance(obj, dict):
+        return {k: _round_floats(v, precision) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_round_floats(v, precision) for v in obj]
+    return obj
+
+def _encode(obj: Any) -> str:
+    """Compact JSON encoding, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, separators=(",", ":"), cls=NumpyEncoder)
+
+def save_animation_json(
+    pose_data: Iterable[Dict],
+    output_path: str,
+    fps: int = 30,
+    total_frames: Optional[int] = None,
+    precision: Optional[int] = ANIMATION_FLOAT_PRECISION
+):
     """
     Saves the pose data sequence to a standardized JSON animation file.
+    Frames are written one at a time as they are drawn from pose_data, so a
+    generator is never materialized when total_frames is supplied.
     """
-    animation_structure = {
-        "metadata": {
-            "version": "1.0",
-            "fps": fps,
-            "total_frames": len(pose_data),
-            "generated_at": str(uuid.uuid4()) # Traceability
-        },
-        "timeline": pose_data
+    if total_frames is None:
+        pose_data = pose_data if isinstance(pose_data, list) else list(pose_data)
+        total_frames = len(pose_data)
+
+    metadata = {
+        "version": "1.0",
+        "fps": fps,
+        "total_frames": total_frames,
+        "generated_at": str(uuid.uuid4()) # Traceability
     }
     
+    written = 0
     with open(output_path, 'w') as f:
-        json.dump(animation_structure, f, indent=2, cls=NumpyEncoder)
+        f.write('{"metadata":')
+        f.write(_encode(metadata))
+        f.write(',"timeline":[')
+        for frame in pose_data:
+            if written:
+                f.write(",")
+            if precision is not None:
+                frame = _round_floats(frame, precision)
+            f.write(_encode(frame))
+            written += 1
+        f.write("]}")
+
+    if written != total_frames:
+        logger.warning(f"Animation {output_path} declared {total_frames} frames but wrote {written}.")
     
     return output_path
 
-def process_stage5(pose_data: Dict[str, Any]) -> Dict[str, Any]:
+class _JsonStream:
+    """Minimal pull reader over a text file for the animation layout written above."""
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, block_size: int = ANIMATION_READ_BLOCK):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.block_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # A value running to the end of the buffer (e.g. a number) may continue in the next block
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def read_animation_json(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
     """
-    Process Pose content from Stage 4 and finalize into Animation artifacts.
+    Opens an animation file written by save_animation_json and returns its metadata
+    and a lazy iterator over its frames, so callers never hold the whole timeline.
+    Files in another key order are loaded in full as a fallback.
     """
-    # Ensure outputs directory exists
-    output_dir = "outputs"
-    os.makedirs(output_dir, exist_ok=True)
+    f = open(path, "r")
+    reader = _JsonStream(f)
+    try:
+        reader.expect("{")
+        if reader.value() != "metadata":
+            raise ValueError("metadata is not the first key")
+        reader.expect(":")
+        metadata = reader.value()
+        reader.expect(",")
+        if reader.value() != "timeline":
+            raise ValueError("timeline does not follow metadata")
+        reader.expect(":")
+        reader.expect("[")
+    except ValueError:
+        f.seek(0)
+        with f:
+            animation = json.load(f)
+        return animation.get("metadata", {}), iter(animation.get("timeline", []))
+
+    def frames() -> Iterator[Dict[str, Any]]:
+        with f:
+            if reader.peek() == "]":
+                return
+            while True:
+                yield reader.value()
+                if reader.peek() == "]":
+                    return
+                reader.expect(",")
+
+    return metadata, frames()
+
+def iter_chapter_frames(sentences_poses: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yields the chapter's frames in order, re-indexed for continuity across sentences."""
+    current_frame_idx = 0
+    for sentence_block in sentences_poses:
+        for frame in sentence_block.get("pose_data", []):
+            # Shallow copy so the Stage 4 frame (often shared between glosses) is not mutated
+            new_frame = dict(frame)
+            new_frame["frame_idx"] = current_frame_idx
+            yield new_frame
+            current_frame_idx += 1
+
+def finalize_chapter(
+    index: int,
+    chapter: Dict[str, Any],
+    output_dir: str = "outputs",
+    url_prefix: Optional[str] = "/outputs"
+) -> Dict[str, Any]:
+    """
+    Flattens one Stage 4 pose chapter into a continuous animation file.
+    Returns the chapter's video entry; video_url is the file's path under url_prefix,
+    or the file path itself when url_prefix is None (files not served by the API).
+    """
+    # Titles come from document headings ("Input/Output", "TCP/IP"), so keep only filename-safe characters
+    title = re.sub(r"[^\w-]+", "_", chapter.get("title", "unknown")).strip("_").lower()[:60] or "untitled"
+    sentences_poses = chapter.get("sentences_poses", [])
+    total_frames = sum(len(block.get("pose_data", [])) for block in sentences_poses)
+    fps = chapter.get("fps", 30)
     
-    video_chapters = []
+    # Generate unique filename
+    unique_id = uuid.uuid4().hex[:8]
+    filename = f"{output_dir}/chapter_{index}_{title}_{unique_id}.json"
     
-    logger.info("Processing Stage 5: Finalizing Animation Files...")
+    # Save the file
+    save_animation_json(iter_chapter_frames(sentences_poses), filename, fps=fps, total_frames=total_frames)
     
-    for i, chapter in enumerate(pose_data.get("pose_chapters", [])):
-        title = chapter.get("title", "unknown").replace(" ", "_").lower()
-        sentences_poses = chapter.get("sentences_poses", [])
-        
-        # Flatten all sentence poses into one continuous chapter animation
-        chapter_timeline = []
-        current_frame_idx = 0
-        
-        for sentence_block in sentences_poses:
-            sentence_frames = sentence_block.get("pose_data", [])
-            
-            # Re-index frames to ensure continuity across the chapter
-            for frame in sentence_frames:
-                # Create a fresh copy to avoid mutating the original reference if needed
-                new_frame = frame.copy()
-                new_frame["frame_idx"] = current_frame_idx
-                chapter_timeline.append(new_frame)
-                current_frame_idx += 1
-        
-        # Generate unique filename
-        unique_id = uuid.uuid4().hex[:8]
-        filename = f"{output_dir}/chapter_{i}_{title}_{unique_id}.json"
-        
-        # Save the file
-        save_animation_json(chapter_timeline, filename)
-        
-        logger.info(f"Saved animation chapter to {filename}")
-        
-        video_chapters.append({
-            "chapter_title": chapter.get("title", "Untitled"),
-            "video_url": f"/outputs/{os.path.basename(filename)}", # Virtual path for API
-            "duration_seconds": len(chapter_timeline) / 30.0, # Assuming 30 FPS
-            "status": "ready"
-        })
-        
+    logger.info(f"Saved animation chapter to {filename}")
+    
+    return {
+        "chapter_title": chapter.get("title", "Untitled"),
+        "video_url": f"{url_prefix}/{os.path.basename(filename)}" if url_prefix else filename,
+        "duration_seconds": total_frames / float(fps),
+        "fps": fps,
+        "status": "ready"
+    }
+
+def summarize_chapters(video_chapters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds the Stage 5 result from finalized chapter entries."""
     # Calculate total duration
     total_duration = sum(ch["duration_seconds"] for ch in video_chapters)
         
@@ -92,3 +232,23 @@ def process_stage5(pose_data: Dict[str, Any]) -> Dict[str, Any]:
             "total_chapters": len(video_chapters)
         }
     }
+
+def process_stage5(
+    pose_data: Dict[str, Any],
+    output_dir: str = "outputs",
+    url_prefix: Optional[str] = "/outputs"
+) -> Dict[str, Any]:
+    """
+    Process Pose content from Stage 4 and finalize into Animation artifacts.
+    """
+    # Ensure outputs directory exists
+    os.makedirs(output_dir, exist_ok=True)
+    
+    logger.info("Processing Stage 5: Finalizing Animation Files...")
+    
+    video_chapters = [
+        finalize_chapter(i, chapter, output_dir, url_prefix)
+        for i, chapter in enumerate(pose_data.get("pose_chapters", []))
+    ]
+        
+    return summarize_chapters(video_chapters)
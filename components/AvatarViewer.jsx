@@ -4,6 +4,7 @@ import { Canvas, useFrame, useThree } from '@react-three/fiber';
 import { useGLTF, Environment, ContactShadows, PerspectiveCamera } from '@react-three/drei';
 import * as THREE from 'three';
 import axios from 'axios';
+import { pipelineService } from '../services/pipelineService';
 
 // Enable modern color management
 THREE.ColorManagement.enabled = true;
@@ -14,7 +15,7 @@ const API_BASE = 'http://127.0.0.1:8000';
  * SkeletalAvatar Component
  * Handles the loading and bone-level animation of the Gloss-generated motion.
  */
-const SkeletalAvatar = ({ timeline, onSceneReady }) => {
+const SkeletalAvatar = ({ timeline, fps = 30, onSceneReady }) => {
     // Load the Mixamo avatar from public/avatar.glb
     const { scene } = useGLTF('/avatar.glb');
     const [frameIdx, setFrameIdx] = useState(0);
@@ -69,9 +70,9 @@ const SkeletalAvatar = ({ timeline, onSceneReady }) => {
     useFrame((state, delta) => {
         if (!timeline || timeline.length === 0) return;
 
-        // Control playback speed (30 FPS)
+        // Control playback speed (chapter FPS)
         lastUpdate.current += delta;
-        if (lastUpdate.current > 1 / 30) {
+        if (lastUpdate.current > 1 / fps) {
             setFrameIdx((prev) => (prev + 1) % timeline.length);
             lastUpdate.current = 0;
         }
@@ -160,18 +161,29 @@ const AutoFrameCamera = ({ targetRef }) => {
 };
 
 const AvatarViewer = ({ motionUrl }) => {
-    const [timeline, setTimeline] = useState([]);
+    // Streamed frames are appended in place; the frame count re-renders as batches arrive
+    // without copying the whole timeline for each one
+    const timelineRef = useRef([]);
+    const [, setFrameCount] = useState(0);
+    const [fps, setFps] = useState(30);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const avatarSceneRef = useRef(null);
 
     useEffect(() => {
+        if (!motionUrl) return;
+        let received = false;
+        let cancelled = false;
+        timelineRef.current = [];
+        setFrameCount(0);
+        setLoading(true);
+
         const fetchMotionData = async () => {
-            if (!motionUrl) return;
             try {
-                setLoading(true);
                 const response = await axios.get(`${API_BASE}${motionUrl}`);
-                setTimeline(response.data.timeline || []);
+                timelineRef.current = response.data.timeline || [];
+                setFrameCount(timelineRef.current.length);
+                setFps(response.data.metadata?.fps || 30);
                 setError(null);
             } catch (err) {
                 console.error("Failed to load motion data:", err);
@@ -181,7 +193,34 @@ const AvatarViewer = ({ motionUrl }) => {
             }
         };
 
-        fetchMotionData();
+        // Stream frames so playback starts with the first batch; fall back to a full download
+        const stream = pipelineService.streamPoses(
+            { chapter: motionUrl.split('/').pop() },
+            (frames) => {
+                received = true;
+                const timeline = timelineRef.current;
+                for (const frame of frames) timeline.push(frame);
+                setFrameCount(timeline.length);
+                setLoading(false);
+            },
+            (header) => setFps(header.fps || 30)
+        );
+        stream.done
+            .then(() => {
+                // A chapter with no frames never calls onFrames
+                setError(null);
+                setLoading(false);
+            })
+            .catch((err) => {
+                if (received || cancelled) return;
+                console.warn("Pose stream unavailable, downloading chapter:", err);
+                fetchMotionData();
+            });
+
+        return () => {
+            cancelled = true;
+            stream.close();
+        };
     }, [motionUrl]);
 
     if (error) return (
@@ -231,7 +270,8 @@ const AvatarViewer = ({ motionUrl }) => {
                 <Environment preset="studio" />
 
                 <SkeletalAvatar
-                    timeline={timeline}
+                    timeline={timelineRef.current}
+                    fps={fps}
                     onSceneReady={(scene) => {
                         avatarSceneRef.current = scene;
                     }}
@@ -253,7 +293,7 @@ const AvatarViewer = ({ motionUrl }) => {
             <div className="absolute bottom-6 left-6 right-6 flex items-center justify-between pointer-events-none">
                 <div className="bg-slate-900/10 backdrop-blur-md px-4 py-2 rounded-full border border-slate-900/5">
                     <span className="text-slate-900 text-xs font-bold uppercase tracking-widest">
-                        GLB SKELETON • 30 FPS • LERP
+                        GLB SKELETON • {fps} FPS • LERP
                     </span>
                 </div>
                 <div className="flex gap-2">
@@ -1,6 +1,32 @@
 import axios from 'axios';
 
 const API_BASE_URL = 'http://127.0.0.1:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+
+/**
+ * Decodes one packed float32 pose message into frame objects.
+ * NaN channels are absent in the source frame and are skipped.
+ */
+const decodePoseFrames = (buffer, header) => {
+    const values = new Float32Array(buffer);
+    const stride = header.floats_per_frame;
+    const faceOffset = header.bones.length * 3;
+    const frames = [];
+    for (let base = 0; base + stride <= values.length; base += stride) {
+        const bones = {};
+        header.bones.forEach((name, i) => {
+            const o = base + i * 3;
+            if (!Number.isNaN(values[o])) bones[name] = [values[o], values[o + 1], values[o + 2]];
+        });
+        const face = {};
+        header.face.forEach((name, i) => {
+            const v = values[base + faceOffset + i];
+            if (!Number.isNaN(v)) face[name] = v;
+        });
+        frames.push(Object.keys(face).length ? { bones, face } : { bones });
+    }
+    return frames;
+};
 
 export const pipelineService = {
     /**
@@ -32,6 +58,60 @@ export const pipelineService = {
         }
     },
 
+    /**
+     * Translates a short text into gloss and an inline pose timeline.
+     * @param {string} text - The sentence to sign.
+     * @param {boolean} simplify - Whether to run text simplification first.
+     * @param {number} fps - Output frame rate of the timeline (1-60).
+     * @param {number} speed - Signing speed multiplier (0.25-4).
+     * @returns {Promise<Object>} - The JSON response from the backend.
+     */
+    translateText: async (text, simplify = true, fps = 30, speed = 1.0) => {
+        try {
+            const response = await axios.post(`${API_BASE_URL}/translate`, { text, simplify, fps, speed });
+            return response.data;
+        } catch (error) {
+            console.error("Translate Error:", error);
+            throw error;
+        }
+    },
+
+    /**
+     * Streams pose frames from the backend over a WebSocket.
+     * @param {Object} source - { chapter: '<file in /outputs>' } or { gloss: 'HELLO WORLD' }.
+     * @param {Function} onFrames - Called with each batch of decoded frames as it arrives.
+     * @param {Function} onHeader - Optional; called with the stream header (bones, fps, ...).
+     * @returns {{ done: Promise<number>, close: Function }} - done resolves with the total frame count.
+     */
+    streamPoses: (source, onFrames, onHeader) => {
+        const socket = new WebSocket(`${WS_BASE_URL}/ws/poses`);
+        socket.binaryType = 'arraybuffer';
+        let header = null;
+
+        const done = new Promise((resolve, reject) => {
+            socket.onopen = () => socket.send(JSON.stringify(source));
+            socket.onmessage = (event) => {
+                if (typeof event.data !== 'string') {
+                    onFrames(decodePoseFrames(event.data, header));
+                    // Acknowledge so the server can keep sending (backpressure window)
+                    socket.send(JSON.stringify({ type: 'ack' }));
+                    return;
+                }
+                const message = JSON.parse(event.data);
+                if (message.type === 'header') {
+                    header = message;
+                    if (onHeader) onHeader(message);
+                }
+                else if (message.type === 'end') resolve(message.total_frames);
+                else if (message.type === 'error') reject(new Error(message.detail));
+            };
+            socket.onerror = () => reject(new Error('Pose stream failed'));
+            socket.onclose = () => reject(new Error('Pose stream closed'));
+        });
+
+        return { done, close: () => socket.close() };
+    },
+
     /**
      * Checks backend health
      */